@@ -13,7 +13,7 @@ class Settings(BaseSettings):
     COMPANY_KEY: str | None = None
     FLASK_ENV: str | None = "development"
     ENCRYPTION_KEY: str | None = None
-    BATCH_SIZE: str | None = "100"
+    BATCH_SIZE: str | None = "1000"
     SOLARMAN_EMAIL: str | None = None
     SOLARMAN_PASSWORD_SHA256: str | None = None
     SOLARMAN_APP_ID: str | None = None
@@ -3,8 +3,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from backend.config.settings import settings
 from backend.controllers.auth import router as auth_router
+from backend.utils.api_utils import configure_logging
 
-logging.basicConfig(level=logging.DEBUG)
+configure_logging(logging.DEBUG)
 app = FastAPI(title="Solar Dashboard Backend")
 
 app.add_middleware(
@@ -0,0 +1,247 @@
+from sqlalchemy.orm import Session
+from psycopg2.extras import execute_values
+from backend.repository.panel_repo import get_cursor, get_prepared_cursor
+import csv
+import io
+import logging
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+DEVICE_DATA_COLUMNS = (
+    "device_sn", "timestamp",
+    *(f"pv{i:02d}_{kind}" for i in range(1, 13) for kind in ("voltage", "current")),
+    "r_voltage", "s_voltage", "t_voltage", "r_current", "s_current", "t_current",
+    "rs_voltage", "st_voltage", "tr_voltage",
+    "frequency", "total_power", "reactive_power", "energy_today", "cuf", "pr", "state"
+)
+# Everything after the (device_sn, timestamp) key, in insert order
+MEASUREMENT_COLUMNS = DEVICE_DATA_COLUMNS[2:]
+
+# Mirrors the CHECK constraints on device_data_historical; a bad field is nulled so the rest of the sample survives
+MEASUREMENT_RANGES = (
+    *((f"pv{i:02d}_voltage", 0, 1000) for i in range(1, 13)),
+    *((f"pv{i:02d}_current", 0, 50) for i in range(1, 13)),
+    *((name, 0, 325) for name in ("r_voltage", "s_voltage", "t_voltage")),
+    *((name, 0, 500) for name in ("r_current", "s_current", "t_current")),
+    *((name, 0, 500) for name in ("rs_voltage", "st_voltage", "tr_voltage")),
+    ("frequency", 0, 70),
+    ("total_power", 0, float("inf")),
+    ("reactive_power", -100000, 100000),
+    ("energy_today", 0, 20000),
+    ("cuf", 0, 100),
+    ("pr", 0, 100),
+)
+
+def range_error(low: float, high: float) -> str:
+    return f"Out of range (expected {low}..{high})"
+
+def range_condition(column: str, low: float, high: float) -> str:
+    return f"{column} >= {low}" if high == float("inf") else f"{column} BETWEEN {low} AND {high}"
+
+# (position in a device data row, column, low, high) for the Python-side range checks
+RANGE_POSITIONS = tuple((DEVICE_DATA_COLUMNS.index(column), column, low, high) for column, low, high in MEASUREMENT_RANGES)
+
+def null_out_of_range(rows: list[tuple]) -> tuple[list[tuple], list[tuple]]:
+    # Python twin of the stage merge's CASE nulling; returns the checked rows and one
+    # (timestamp, field_name, field_value, error_message) per nulled value
+    checked = []
+    field_errors = []
+    for row in rows:
+        values = list(row)
+        for position, name, low, high in RANGE_POSITIONS:
+            value = values[position]
+            if value is None:
+                continue
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                field_errors.append((row[1], name, value, "Non-numeric value"))
+                values[position] = None
+                continue
+            if low <= number <= high:
+                values[position] = number
+            else:
+                field_errors.append((row[1], name, value, range_error(low, high)))
+                values[position] = None
+        checked.append(tuple(values))
+    return checked, field_errors
+
+INSERT_DEVICE_DATA_SQL = f"""
+    INSERT INTO device_data_historical ({", ".join(DEVICE_DATA_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (device_sn, timestamp) DO NOTHING
+    RETURNING 1
+"""
+DEVICE_DATA_TEMPLATE = f"({', '.join(['%s'] * len(DEVICE_DATA_COLUMNS))})"
+
+PREPARED_STATEMENTS = {
+    "ins_hist": f"""
+        PREPARE ins_hist (text, timestamptz, {", ".join(["double precision"] * (len(DEVICE_DATA_COLUMNS) - 3))}, text) AS
+        INSERT INTO device_data_historical ({", ".join(DEVICE_DATA_COLUMNS)})
+        VALUES ({", ".join(f"${i}" for i in range(1, len(DEVICE_DATA_COLUMNS) + 1))})
+        ON CONFLICT (device_sn, timestamp) DO NOTHING
+    """,
+}
+EXECUTE_DEVICE_DATA_SQL = f"EXECUTE ins_hist ({', '.join(['%s'] * len(DEVICE_DATA_COLUMNS))})"
+# Up to this many rows, EXECUTEs of the cached plan beat planning a fresh multi-row VALUES list
+PREPARED_BATCH_LIMIT = 50
+
+ERROR_LOG_COLUMNS = ("customer_id", "device_sn", "timestamp", "api_provider", "field_name", "field_value", "error_message")
+
+# COPY has no ON CONFLICT, so bulk loads land in a session-local stage table first
+CREATE_STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS device_data_historical_stage
+    (LIKE device_data_historical INCLUDING DEFAULTS)
+    ON COMMIT DELETE ROWS
+"""
+
+# Out-of-range values are nulled server-side while merging, so bulk loads skip the Python range checks
+MEASUREMENT_BOUNDS = {column: (low, high) for column, low, high in MEASUREMENT_RANGES}
+STAGE_SELECT_COLUMNS = tuple(
+    f"CASE WHEN {range_condition(column, *MEASUREMENT_BOUNDS[column])} THEN {column} END" if column in MEASUREMENT_BOUNDS else column
+    for column in DEVICE_DATA_COLUMNS
+)
+# Overlapping re-fetch windows mostly resend stored samples; the anti-join drops them before the insert,
+# and ON CONFLICT only has to catch duplicates inside the batch itself
+STAGE_NEW_ROWS = """
+    FROM device_data_historical_stage s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM device_data_historical d
+        WHERE d.device_sn = s.device_sn AND d.timestamp = s.timestamp
+    )
+"""
+MERGE_STAGE_SQL = f"""
+    INSERT INTO device_data_historical ({", ".join(DEVICE_DATA_COLUMNS)})
+    SELECT {", ".join(STAGE_SELECT_COLUMNS)}
+    {STAGE_NEW_ROWS}
+    ON CONFLICT (device_sn, timestamp) DO NOTHING
+"""
+
+# One (timestamp, field_name, field_value, error_message) row per nulled value of a new sample, read back before the merge
+STAGE_FIELD_ERRORS_SQL = f"""
+    SELECT s.timestamp, v.field_name, v.field_value, v.error_message
+    FROM device_data_historical_stage s
+    CROSS JOIN LATERAL (VALUES {", ".join(
+        f"('{column}', s.{column}, s.{range_condition(column, low, high)}, '{range_error(low, high)}')"
+        for column, low, high in MEASUREMENT_RANGES
+    )}) AS v (field_name, field_value, valid, error_message)
+    WHERE NOT v.valid AND NOT EXISTS (
+        SELECT 1 FROM device_data_historical d
+        WHERE d.device_sn = s.device_sn AND d.timestamp = s.timestamp
+    )
+"""
+
+def copy_rows(cur, table: str, columns: tuple, rows) -> None:
+    buf = io.StringIO()
+    # csv.writer quotes and escapes text values; None is written as an empty unquoted field, i.e. NULL
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT CSV, NULL '')", buf)
+
+def insert_device_rows(session: Session, rows: list[tuple], page_size: int) -> tuple[int, list[tuple[tuple, str]]]:
+    # Returns the rows actually inserted (ON CONFLICT skips are not counted) and the rejected rows.
+    # CHECK constraints are the validation: a rejected batch is halved until the offending rows are isolated
+    cur = get_cursor(session)
+    cur.execute("SAVEPOINT device_data_batch")
+    try:
+        if len(rows) <= PREPARED_BATCH_LIMIT:
+            # Small batches reuse one server-side plan; each EXECUTE reports its own rowcount, which execute_batch would lose
+            prepared_cur = get_prepared_cursor(session, "ins_hist", PREPARED_STATEMENTS)
+            inserted = 0
+            for row in rows:
+                prepared_cur.execute(EXECUTE_DEVICE_DATA_SQL, row)
+                inserted += prepared_cur.rowcount
+        else:
+            # One multi-row INSERT per page instead of a round-trip per sample; RETURNING yields one row per inserted sample
+            inserted = len(execute_values(cur, INSERT_DEVICE_DATA_SQL, rows, template=DEVICE_DATA_TEMPLATE, page_size=page_size, fetch=True))
+        cur.execute("RELEASE SAVEPOINT device_data_batch")
+        return inserted, []
+    except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+        cur.execute("ROLLBACK TO SAVEPOINT device_data_batch")
+        cur.execute("RELEASE SAVEPOINT device_data_batch")
+        if len(rows) == 1:
+            logger.warning(f"Rejected device data row {rows[0][:2]}: {e}")
+            return 0, [(rows[0], str(e).strip())]
+    middle = len(rows) // 2
+    first_inserted, first_rejected = insert_device_rows(session, rows[:middle], page_size)
+    second_inserted, second_rejected = insert_device_rows(session, rows[middle:], page_size)
+    return first_inserted + second_inserted, first_rejected + second_rejected
+
+def insert_device_data(session: Session, rows: list[tuple], page_size: int = 1000) -> tuple[int, list[tuple[tuple, str]]]:
+    if not rows:
+        return 0, []
+    try:
+        inserted, rejected = insert_device_rows(session, rows, page_size)
+    except Exception as e:
+        logger.error(f"Error inserting device data: {e}")
+        raise
+    if rejected:
+        logger.warning(f"Rejected {len(rejected)}/{len(rows)} device data rows")
+    logger.debug("Inserted %s of %s device data rows in pages of %s", inserted, len(rows), page_size)
+    return inserted, rejected
+
+def copy_device_data(session: Session, rows: list[tuple]) -> tuple[int, list[tuple], list[tuple[tuple, str]]]:
+    # Returns the number of rows stored, the field values nulled during the merge and the rows the database rejected outright
+    if not rows:
+        return 0, [], []
+    cur = get_cursor(session)
+    field_errors = []
+    try:
+        cur.execute(CREATE_STAGE_SQL)
+        cur.execute("SAVEPOINT device_data_copy")
+        try:
+            copy_rows(cur, "device_data_historical_stage", DEVICE_DATA_COLUMNS, rows)
+            cur.execute(STAGE_FIELD_ERRORS_SQL)
+            field_errors = cur.fetchall()
+            cur.execute(MERGE_STAGE_SQL)
+            inserted = cur.rowcount
+            cur.execute("RELEASE SAVEPOINT device_data_copy")
+            logger.debug("Copied %s device data rows, %s new", len(rows), inserted)
+            merged = True
+        except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+            cur.execute("ROLLBACK TO SAVEPOINT device_data_copy")
+            cur.execute("RELEASE SAVEPOINT device_data_copy")
+            logger.warning(f"Copied batch violates a constraint, falling back to batched inserts: {e}")
+            merged = False
+        # Several devices can be copied before the credential's single commit
+        cur.execute("TRUNCATE device_data_historical_stage")
+    except Exception as e:
+        logger.error(f"Error copying device data: {e}")
+        raise
+    if merged:
+        return inserted, field_errors, []
+    # The fallback skips the merge's CASE nulling, so out-of-range values are nulled here to reject no more rows than COPY would
+    rows, field_errors = null_out_of_range(rows)
+    inserted, rejected = insert_device_data(session, rows)
+    return inserted, field_errors, rejected
+
+def refresh_customer_metrics(session: Session) -> None:
+    cur = get_cursor(session)
+    try:
+        # CONCURRENTLY keeps the view readable during the refresh but needs it populated once without it
+        cur.execute("SELECT ispopulated FROM pg_matviews WHERE matviewname = 'customer_metrics'")
+        row = cur.fetchone()
+        if row is None:
+            logger.warning("customer_metrics view does not exist, skipping refresh")
+            return
+        cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if row[0] else ''}customer_metrics")
+        logger.info("Refreshed customer_metrics")
+    except Exception as e:
+        logger.error(f"Error refreshing customer_metrics: {e}")
+        raise
+
+def insert_error_logs(session: Session, errors: list[tuple]) -> None:
+    if not errors:
+        return
+    # Rides on the caller's pooled connection and transaction; error_logs is append-only, so COPY needs no stage table
+    cur = get_cursor(session)
+    cur.execute("SAVEPOINT error_logs_batch")
+    try:
+        copy_rows(cur, "error_logs", ERROR_LOG_COLUMNS, errors)
+        cur.execute("RELEASE SAVEPOINT error_logs_batch")
+    except Exception as e:
+        # The device data in the same transaction must still commit, so a failed log write only loses the logs
+        cur.execute("ROLLBACK TO SAVEPOINT error_logs_batch")
+        cur.execute("RELEASE SAVEPOINT error_logs_batch")
+        logger.error(f"Error writing {len(errors)} error logs, dropping them: {e}")
@@ -0,0 +1,131 @@
+from sqlalchemy.orm import Session
+from psycopg2.extras import execute_values
+from operator import itemgetter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# created_at is left to the column DEFAULT NOW() so a whole batch shares the transaction timestamp
+PREPARED_STATEMENTS = {
+    "ins_plant": """
+        PREPARE ins_plant (text, text, text, double precision, double precision, date) AS
+        INSERT INTO plants (plant_id, customer_id, plant_name, capacity, total_energy, install_date)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (plant_id) DO NOTHING
+    """,
+}
+
+EXECUTE_PLANT_SQL = "EXECUTE ins_plant (%(plant_id)s, %(customer_id)s, %(plant_name)s, %(capacity)s, %(total_energy)s, %(install_date)s)"
+
+UPSERT_PLANTS_SQL = """
+    INSERT INTO plants (plant_id, customer_id, plant_name, capacity, total_energy, install_date)
+    VALUES %s
+    ON CONFLICT (plant_id) DO NOTHING
+    RETURNING plant_id
+"""
+PLANT_TEMPLATE = "(%(plant_id)s, %(customer_id)s, %(plant_name)s, %(capacity)s, %(total_energy)s, %(install_date)s)"
+
+UPSERT_DEVICES_SQL = """
+    INSERT INTO devices (device_sn, plant_id, inverter_model, panel_model, pv_count, string_count, first_install_date)
+    VALUES %s
+    ON CONFLICT (device_sn) DO NOTHING
+    RETURNING device_sn
+"""
+DEVICE_TEMPLATE = "(%(device_sn)s, %(plant_id)s, %(inverter_model)s, %(panel_model)s, %(pv_count)s, %(string_count)s, %(first_install_date)s)"
+
+# Transaction-scoped and non-blocking: a device another worker is already loading is skipped, not waited on
+LOCK_DEVICES_SQL = """
+    SELECT device_sn FROM unnest(%s::text[]) AS device_sn
+    WHERE pg_try_advisory_xact_lock(hashtext('device_data_historical'), hashtext(device_sn))
+"""
+
+def get_cursor(session: Session):
+    # One plain cursor per DBAPI connection, kept in its pool-scoped info dict and reused by every repo call
+    dbapi_conn = session.connection().connection
+    cur = dbapi_conn.info.get("cursor")
+    if cur is None or cur.closed:
+        cur = dbapi_conn.info["cursor"] = dbapi_conn.cursor()
+    return cur
+
+def get_prepared_cursor(session: Session, name: str, statements: dict = PREPARED_STATEMENTS):
+    # Prepared statements live as long as the DBAPI connection, so track them in the same info dict
+    dbapi_conn = session.connection().connection
+    prepared = dbapi_conn.info.setdefault("prepared_statements", set())
+    cur = get_cursor(session)
+    if name not in prepared:
+        cur.execute(statements[name])
+        prepared.add(name)
+        logger.debug("Prepared statement %s on connection %s", name, id(dbapi_conn))
+    return cur
+
+def insert_rows_individually(cur, rows: list, key, insert_row) -> list:
+    # Slow path after a failed batch: one savepoint per row so a single bad row is skipped, not the whole batch
+    inserted = []
+    for row in rows:
+        cur.execute("SAVEPOINT row_insert")
+        try:
+            inserted.extend(insert_row(cur, row))
+            cur.execute("RELEASE SAVEPOINT row_insert")
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT row_insert")
+            cur.execute("RELEASE SAVEPOINT row_insert")
+            logger.error(f"Skipping row {key(row)}: {e}")
+    return inserted
+
+def insert_plant(cur, plant: dict) -> list[str]:
+    cur.execute(EXECUTE_PLANT_SQL, plant)
+    return [plant["plant_id"]] if cur.rowcount else []
+
+def insert_device(cur, device: dict) -> list[str]:
+    return [row[0] for row in execute_values(cur, UPSERT_DEVICES_SQL, [device], template=DEVICE_TEMPLATE, fetch=True)]
+
+def upsert_plants(session: Session, plants: list[dict]) -> list[str]:
+    if not plants:
+        return []
+    # Presorting on the primary key keeps b-tree inserts on neighbouring leaf pages
+    plants = sorted(plants, key=itemgetter("plant_id"))
+    cur = get_cursor(session)
+    cur.execute("SAVEPOINT plants_batch")
+    try:
+        inserted = [row[0] for row in execute_values(cur, UPSERT_PLANTS_SQL, plants, template=PLANT_TEMPLATE, page_size=500, fetch=True)]
+        cur.execute("RELEASE SAVEPOINT plants_batch")
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT plants_batch")
+        cur.execute("RELEASE SAVEPOINT plants_batch")
+        logger.error(f"Error upserting plants in batch, retrying one by one: {e}")
+        inserted = insert_rows_individually(get_prepared_cursor(session, "ins_plant"), plants, itemgetter("plant_id"), insert_plant)
+    logger.info(f"Inserted {len(inserted)}/{len(plants)} plants")
+    return inserted
+
+def upsert_devices(session: Session, devices: list[dict]) -> list[str]:
+    if not devices:
+        return []
+    devices = sorted(devices, key=itemgetter("plant_id", "device_sn"))
+    cur = get_cursor(session)
+    cur.execute("SAVEPOINT devices_batch")
+    try:
+        # One multi-row INSERT ... RETURNING per page instead of a round-trip per device
+        inserted = [row[0] for row in execute_values(cur, UPSERT_DEVICES_SQL, devices, template=DEVICE_TEMPLATE, page_size=500, fetch=True)]
+        cur.execute("RELEASE SAVEPOINT devices_batch")
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT devices_batch")
+        cur.execute("RELEASE SAVEPOINT devices_batch")
+        logger.error(f"Error upserting devices in batch, retrying one by one: {e}")
+        inserted = insert_rows_individually(cur, devices, itemgetter("device_sn"), insert_device)
+    logger.info(f"Inserted {len(inserted)}/{len(devices)} devices")
+    logger.debug("Newly inserted devices: %s", inserted)
+    return inserted
+
+def lock_devices(session: Session, device_sns: list[str]) -> set[str]:
+    if not device_sns:
+        return set()
+    try:
+        cur = get_cursor(session)
+        cur.execute(LOCK_DEVICES_SQL, (device_sns,))
+        locked = {row[0] for row in cur.fetchall()}
+    except Exception as e:
+        logger.error(f"Error locking devices: {e}")
+        raise
+    if len(locked) < len(device_sns):
+        logger.info(f"Skipping {len(device_sns) - len(locked)} devices locked by another worker")
+    return locked
@@ -24,7 +24,7 @@ def get_user_by_username(username: str) -> dict | None:
                 {"username": username}
             )
             row = result.mappings().fetchone()
-            logger.debug(f"User query by username {username}: {row}")
+            logger.debug("User query by username %s: %s", username, row)
             return dict(row) if row else None
     except Exception as e:
         logger.error(f"Error querying user by username {username}: {e}")
@@ -38,7 +38,7 @@ def get_user_by_email(email: str) -> dict | None:
                 {"email": email}
             )
             row = result.mappings().fetchone()
-            logger.debug(f"User query by email {email}: {row}")
+            logger.debug("User query by email %s: %s", email, row)
             return dict(row) if row else None
     except Exception as e:
         logger.error(f"Error querying user by email {email}: {e}")
@@ -58,7 +58,7 @@ async def create_user(user_data: dict) -> dict:
             result = session.execute(query, user_data_serialized)
             session.commit()
             row = result.mappings().fetchone()
-            logger.debug(f"Created user: {row}")
+            logger.debug("Created user: %s", row)
             if row:
                 row = dict(row)
                 row['profile'] = json.loads(row['profile']) if row['profile'] else {}
@@ -79,7 +79,7 @@ async def verify_user(email: str) -> dict:
             result = session.execute(query, {"email": email})
             session.commit()
             row = result.mappings().fetchone()
-            logger.debug(f"Verified user: {row}")
+            logger.debug("Verified user: %s", row)
             if row:
                 row = dict(row)
                 row['profile'] = json.loads(row['profile']) if row['profile'] else {}
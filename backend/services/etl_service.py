@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from operator import itemgetter
+from sqlalchemy.orm import Session
+from backend.config.settings import settings
+from backend.repository.metric_repo import MEASUREMENT_COLUMNS, null_out_of_range, insert_device_data, copy_device_data
+from backend.utils.api_utils import epoch_seconds
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATE_POSITION = MEASUREMENT_COLUMNS.index("state")
+
+# Below this many rows the COPY + stage-table round-trips cost more than they save on real-time batches
+COPY_THRESHOLD = 2000
+
+def measurement_values(entry: dict) -> list:
+    # Reads the raw client entry straight into column order; absent keys become NULL without copying a defaults dict
+    values = list(map(entry.get, MEASUREMENT_COLUMNS))
+    values[STATE_POSITION] = str(values[STATE_POSITION] or "unknown")
+    return values
+
+def log_timestamp(value, logged_at: datetime) -> datetime:
+    # error_logs.timestamp is NOT NULL timestamptz; a sample stamp that is missing or does not parse falls back to the logging time
+    if isinstance(value, datetime):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return logged_at
+    try:
+        return datetime.fromtimestamp(epoch_seconds(number), tz=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return logged_at
+
+def error_log_rows(customer_id: str, device_sn: str, api_provider: str, validation_errors: list[tuple], rejected: list[tuple[tuple, str]]) -> list[tuple]:
+    # Field-level and row-level failures for one device, shaped for insert_error_logs
+    logged_at = datetime.now(timezone.utc)
+    errors = [
+        (customer_id, device_sn, log_timestamp(timestamp, logged_at), api_provider, field_name, str(field_value), error)
+        for timestamp, field_name, field_value, error in validation_errors
+    ]
+    # A rejected row keeps its raw provider timestamp in field_value, since that stamp may be why it was rejected
+    errors.extend(
+        (customer_id, device_sn, log_timestamp(row[1], logged_at), api_provider, None, None if row[1] is None else str(row[1]), error)
+        for row, error in rejected
+    )
+    return errors
+
+def insert_data_to_db(session: Session, data: list[dict], device_sn: str, customer_id: str, api_provider: str, is_real_time: bool = False) -> tuple[int, list[tuple]]:
+    # Returns the rows stored and the error_logs rows; errors are not written here so the caller can flush a whole credential's at once
+    # Historical backfills always stream through COPY; real-time polls are a handful of rows per device
+    use_copy = not is_real_time or len(data) >= COPY_THRESHOLD
+    rows = []
+    validation_errors = []
+    for entry in data:
+        timestamp = entry.get("timestamp")
+        if not timestamp:
+            logger.warning(f"Skipping {api_provider} entry without timestamp for device {device_sn}")
+            continue
+        rows.append((device_sn, timestamp, *measurement_values(entry)))
+    # Bulk loads are range-checked server-side in the stage merge
+    if not use_copy:
+        rows, validation_errors = null_out_of_range(rows)
+    if validation_errors:
+        logger.warning(f"Nulled {len(validation_errors)} invalid values for device {device_sn}")
+
+    if not rows:
+        logger.info(f"No data to insert for device {device_sn} (customer {customer_id})")
+        return 0, []
+    # Primary key is (device_sn, timestamp); sorted input keeps index inserts local
+    rows.sort(key=itemgetter(1))
+    if use_copy:
+        stored, field_errors, rejected = copy_device_data(session, rows)
+        validation_errors.extend(field_errors)
+    else:
+        stored, rejected = insert_device_data(session, rows, page_size=int(settings.BATCH_SIZE or 1000))
+    logger.info(f"Sent {len(rows)} {'real-time' if is_real_time else 'historical'} rows for device {device_sn} (customer {customer_id})")
+    return stored, error_log_rows(customer_id, device_sn, api_provider, validation_errors, rejected)
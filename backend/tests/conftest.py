@@ -0,0 +1,4 @@
+import os
+
+# Settings() requires the auth secret at import time; the ETL tests never touch auth
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
@@ -0,0 +1,52 @@
+from logging.handlers import QueueHandler
+import importlib
+import logging
+from backend.utils import api_utils
+from backend.utils.api_utils import dedupe_entries, flatten_data
+
+def test_flatten_data_walks_nested_pages_in_order():
+    data = [
+        [{"timestamp": "2024-01-01 00:00:00", "a": 1}, {"timestamp": "2024-01-01 00:05:00", "a": 2}],
+        [[{"timestamp": "2024-01-01 00:10:00", "a": 3}]],
+        None,
+    ]
+    assert [entry["a"] for entry in flatten_data(data)] == [1, 2, 3]
+
+def test_flatten_data_handles_empty_and_flat_input():
+    assert flatten_data(None) == []
+    assert flatten_data([]) == []
+    assert flatten_data({"timestamp": 1, "a": 1}) == [{"timestamp": 1, "a": 1}]
+
+def test_dedupe_entries_collapses_epoch_units_and_keeps_latest():
+    entries = [
+        {"timestamp": 1700000000, "a": 1},
+        {"timestamp": "1700000000000", "a": 2},
+        {"timestamp": 1700000300.0, "a": 3},
+        {"a": 4},
+        {"timestamp": "2024-01-01 00:00:00", "a": 5},
+    ]
+    # A later duplicate replaces the earlier value; entries without a timestamp are kept at the end
+    assert [entry["a"] for entry in dedupe_entries(entries)] == [2, 3, 5, 4]
+
+def test_client_imports_leave_root_logging_alone(monkeypatch):
+    root = logging.getLogger()
+    # An unconfigured root, so a stray basicConfig in a client would take effect
+    monkeypatch.setattr(root, "handlers", [])
+    monkeypatch.setattr(root, "level", logging.WARNING)
+    # reload re-runs the module body even if another test imported the client first
+    for name in ("solarman_api", "shinemonitor_api", "soliscloud_api"):
+        importlib.reload(importlib.import_module(f"backend.utils.api_clients.{name}"))
+    assert root.handlers == []
+    assert root.level == logging.WARNING
+
+def test_configure_logging_installs_one_queue_handler(monkeypatch):
+    root = logging.getLogger()
+    monkeypatch.setattr(api_utils, "_logging_configured", False)
+    monkeypatch.setattr(root, "handlers", list(root.handlers))
+    monkeypatch.setattr(root, "level", root.level)
+
+    api_utils.configure_logging(logging.INFO)
+    api_utils.configure_logging(logging.DEBUG)
+
+    assert len([handler for handler in root.handlers if isinstance(handler, QueueHandler)]) == 1
+    assert root.level == logging.INFO
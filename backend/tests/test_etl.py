@@ -0,0 +1,240 @@
+from datetime import datetime, timezone
+from operator import itemgetter
+from pathlib import Path
+import psycopg2
+import pytest
+import re
+from backend.repository import metric_repo
+from backend.repository.metric_repo import (
+    CREATE_STAGE_SQL, DEVICE_DATA_COLUMNS, MEASUREMENT_COLUMNS, MEASUREMENT_RANGES, MERGE_STAGE_SQL,
+    STAGE_FIELD_ERRORS_SQL, STAGE_SELECT_COLUMNS, copy_device_data, copy_rows, insert_device_rows,
+    null_out_of_range, range_condition, range_error,
+)
+from backend.repository import panel_repo
+from backend.repository.panel_repo import insert_rows_individually, upsert_devices
+from backend.services.etl_service import error_log_rows
+
+def bad_sample(row):
+    # Stands in for a CHECK violation: pr == -1 is out of range
+    return row[DEVICE_DATA_COLUMNS.index("pr")] == -1
+
+class FakeCursor:
+    def __init__(self, reject=lambda params: False):
+        self.closed = False
+        self.statements = []
+        self.copied = []
+        self.reject = reject
+        self.copy_error = None
+        self.rowcount = -1
+        self.results = []
+        # (device_sn, timestamp) keys already stored, so ON CONFLICT DO NOTHING can skip them
+        self.stored = set()
+        self.savepoints = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql.strip())
+        # Rows written after a savepoint disappear again on ROLLBACK TO, as in the database
+        if sql.startswith("SAVEPOINT"):
+            self.savepoints.append(set(self.stored))
+        elif sql.startswith("ROLLBACK TO SAVEPOINT"):
+            self.stored = set(self.savepoints[-1])
+        elif sql.startswith("RELEASE SAVEPOINT"):
+            self.savepoints.pop()
+        if params is not None:
+            if self.reject(params):
+                raise psycopg2.IntegrityError("check constraint violated")
+            self.rowcount = len(self.store([params]))
+
+    def store(self, rows):
+        new = [row for row in rows if row[:2] not in self.stored]
+        self.stored.update(row[:2] for row in new)
+        return new
+
+    def copy_expert(self, sql, file):
+        if self.copy_error:
+            raise self.copy_error
+        self.copied.append((sql, file.read()))
+
+    def fetchall(self):
+        return self.results
+
+class FakeDBAPIConnection:
+    def __init__(self, reject):
+        self.info = {}
+        self.cur = FakeCursor(reject)
+
+    def cursor(self):
+        return self.cur
+
+class FakeSession:
+    # get_cursor reaches the DBAPI connection through session.connection().connection
+    def __init__(self, reject=bad_sample):
+        self.dbapi_conn = FakeDBAPIConnection(reject)
+        self.cur = self.dbapi_conn.cur
+
+    def connection(self):
+        return type("Connection", (), {"connection": self.dbapi_conn})()
+
+def make_row(timestamp, **values):
+    row = dict.fromkeys(DEVICE_DATA_COLUMNS)
+    row.update(device_sn="SN1", timestamp=timestamp, state="normal", **values)
+    return tuple(row[column] for column in DEVICE_DATA_COLUMNS)
+
+@pytest.fixture
+def failing_batches(monkeypatch):
+    # Any multi-row batch containing a bad sample fails as a whole; otherwise one RETURNING row per new sample
+    def run(cur, sql, rows, **kwargs):
+        if any(bad_sample(row) for row in rows):
+            raise psycopg2.IntegrityError("check constraint violated")
+        return [(1,) for _ in cur.store(rows)]
+    monkeypatch.setattr(metric_repo, "execute_values", run)
+
+def test_copy_rows_writes_csv_with_unquoted_nulls():
+    cur = FakeCursor()
+    copy_rows(cur, "device_data_historical_stage", ("device_sn", "timestamp", "pr", "state"), [
+        ("SN1", "2024-01-01 00:00:00", 80.5, 'fault, "E1"'),
+        ("SN1", "2024-01-01 00:05:00", None, None),
+    ])
+
+    sql, data = cur.copied[0]
+    assert sql == "COPY device_data_historical_stage (device_sn, timestamp, pr, state) FROM STDIN WITH (FORMAT CSV, NULL '')"
+    # Text is quoted and escaped; None becomes an empty unquoted field, which COPY reads as NULL
+    assert data == 'SN1,2024-01-01 00:00:00,80.5,"fault, ""E1"""\r\nSN1,2024-01-01 00:05:00,,\r\n'
+
+def test_insert_rows_individually_skips_failing_rows():
+    def insert_row(cur, row):
+        if row["device_sn"] == "BAD":
+            raise psycopg2.IntegrityError("duplicate key")
+        return [row["device_sn"]]
+    cur = FakeCursor()
+    rows = [{"device_sn": "A"}, {"device_sn": "BAD"}, {"device_sn": "C"}]
+
+    assert insert_rows_individually(cur, rows, itemgetter("device_sn"), insert_row) == ["A", "C"]
+    assert cur.statements.count("SAVEPOINT row_insert") == 3
+    assert cur.statements.count("ROLLBACK TO SAVEPOINT row_insert") == 1
+    # Every savepoint is released, rolled back or not, so they do not pile up in the transaction
+    assert cur.statements.count("RELEASE SAVEPOINT row_insert") == 3
+
+def test_upsert_devices_falls_back_to_one_by_one(monkeypatch):
+    def run(cur, sql, devices, **kwargs):
+        if any(device["device_sn"] == "BAD" for device in devices):
+            raise psycopg2.IntegrityError("foreign key violated")
+        return [(device["device_sn"],) for device in devices]
+    monkeypatch.setattr(panel_repo, "execute_values", run)
+    session = FakeSession()
+    devices = [{"plant_id": "P1", "device_sn": sn} for sn in ("C", "BAD", "A")]
+
+    assert upsert_devices(session, devices) == ["A", "C"]
+    statements = session.cur.statements
+    assert statements[:3] == ["SAVEPOINT devices_batch", "ROLLBACK TO SAVEPOINT devices_batch", "RELEASE SAVEPOINT devices_batch"]
+    assert statements.count("SAVEPOINT row_insert") == statements.count("RELEASE SAVEPOINT row_insert") == 3
+
+# Small batches go through the prepared EXECUTE path, larger ones through execute_values
+@pytest.mark.parametrize("count", [8, metric_repo.PREPARED_BATCH_LIMIT + 10])
+def test_insert_device_rows_bisects_to_rejected_rows(failing_batches, count):
+    rows = [make_row(f"2024-01-01 00:{i:02d}:00", pr=-1 if i in (2, 5) else 80) for i in range(count)]
+    session = FakeSession()
+
+    inserted, rejected = insert_device_rows(session, rows, page_size=1000)
+
+    assert inserted == count - 2
+    assert rejected == [(rows[2], "check constraint violated"), (rows[5], "check constraint violated")]
+
+    statements = session.cur.statements
+    assert statements.count("SAVEPOINT device_data_batch") == statements.count("RELEASE SAVEPOINT device_data_batch")
+    assert statements.count("ROLLBACK TO SAVEPOINT device_data_batch") > 0
+
+def test_insert_device_rows_accepts_clean_batch(failing_batches):
+    rows = [make_row(f"2024-01-01 00:{i:02d}:00", pr=80) for i in range(4)]
+    assert insert_device_rows(FakeSession(), rows, page_size=1000) == (4, [])
+
+@pytest.mark.parametrize("count", [8, metric_repo.PREPARED_BATCH_LIMIT + 10])
+def test_insert_device_rows_counts_only_new_rows(failing_batches, count):
+    rows = [make_row(f"2024-01-01 00:{i:02d}:00", pr=80) for i in range(count)]
+    session = FakeSession()
+    # A re-fetched window: the first three samples are already stored and ON CONFLICT skips them
+    session.cur.stored.update(row[:2] for row in rows[:3])
+
+    assert insert_device_rows(session, rows, page_size=1000) == (count - 3, [])
+
+def test_null_out_of_range_matches_stage_merge():
+    rows = [make_row("2024-01-01 00:00:00", pv01_voltage=1200, pv01_current="5", frequency="abc")]
+
+    checked, field_errors = null_out_of_range(rows)
+
+    row = dict(zip(DEVICE_DATA_COLUMNS, checked[0]))
+    assert row["pv01_voltage"] is None
+    assert row["pv01_current"] == 5.0
+    assert row["frequency"] is None
+    assert field_errors == [
+        ("2024-01-01 00:00:00", "pv01_voltage", 1200, range_error(0, 1000)),
+        ("2024-01-01 00:00:00", "frequency", "abc", "Non-numeric value"),
+    ]
+
+def test_measurement_ranges_match_schema_checks():
+    # The CHECK constraints in schema.sql are the source of truth; the Python checks and the stage merge must not drift from them
+    schema = (Path(__file__).resolve().parents[2] / "schema.sql").read_text()
+    table = re.search(r"CREATE TABLE device_data_historical \((.*?)\n\);", schema, re.S).group(1)
+    checks = {
+        column: (float(low), float(high) if high else float("inf"))
+        for column, low, high in re.findall(r"(\w+) DOUBLE PRECISION CHECK \(\1 >= (-?\d+)(?: AND \1 <= (-?\d+))?\)", table)
+    }
+    assert {column: (low, high) for column, low, high in MEASUREMENT_RANGES} == checks
+    # Every numeric column is range-checked; only state passes through the merge untouched
+    assert set(MEASUREMENT_COLUMNS) - set(checks) == {"state"}
+
+def test_stage_merge_nulls_every_ranged_column():
+    selected = dict(zip(DEVICE_DATA_COLUMNS, STAGE_SELECT_COLUMNS))
+    for column, low, high in MEASUREMENT_RANGES:
+        assert selected[column] == f"CASE WHEN {range_condition(column, low, high)} THEN {column} END"
+        assert f"('{column}', s.{column}, s.{range_condition(column, low, high)}, '{range_error(low, high)}')" in STAGE_FIELD_ERRORS_SQL
+    assert [selected[column] for column in ("device_sn", "timestamp", "state")] == ["device_sn", "timestamp", "state"]
+
+def test_copy_device_data_merges_through_the_stage():
+    rows = [make_row("2024-01-01 00:00:00", pv01_voltage=1200), make_row("2024-01-01 00:05:00", pr=80)]
+    session = FakeSession()
+    session.cur.rowcount = 2
+    session.cur.results = [("2024-01-01 00:00:00", "pv01_voltage", 1200.0, range_error(0, 1000))]
+
+    assert copy_device_data(session, rows) == (2, session.cur.results, [])
+    assert session.cur.statements == [
+        CREATE_STAGE_SQL.strip(),
+        "SAVEPOINT device_data_copy",
+        STAGE_FIELD_ERRORS_SQL.strip(),
+        MERGE_STAGE_SQL.strip(),
+        "RELEASE SAVEPOINT device_data_copy",
+        "TRUNCATE device_data_historical_stage",
+    ]
+    assert session.cur.copied[0][1].count("\r\n") == 2
+
+def test_copy_device_data_fallback_nulls_like_the_merge(failing_batches):
+    # pr == -1 would fail the CHECK, so the fallback must null it instead of rejecting the row
+    rows = [make_row("2024-01-01 00:00:00", pr=-1), make_row("2024-01-01 00:05:00", pr=80)]
+    session = FakeSession()
+    session.cur.copy_error = psycopg2.DataError("invalid input syntax for type double precision")
+
+    stored, field_errors, rejected = copy_device_data(session, rows)
+
+    assert (stored, rejected) == (2, [])
+    assert field_errors == [("2024-01-01 00:00:00", "pr", -1, range_error(0, 100))]
+    assert "ROLLBACK TO SAVEPOINT device_data_copy" in session.cur.statements
+
+def test_error_log_rows_shapes_field_errors_and_rejected_rows():
+    field_errors = [("2024-01-01 00:00:00", "pv01_voltage", 1200, range_error(0, 1000))]
+    rejected = [
+        (make_row("1700000000000"), "bad row"),
+        (make_row(None), "null timestamp"),
+        (make_row("not a time"), "bad timestamp"),
+    ]
+
+    before = datetime.now(timezone.utc)
+    errors = error_log_rows("cust", "SN1", "solarman", field_errors, rejected)
+    after = datetime.now(timezone.utc)
+
+    assert errors[0] == ("cust", "SN1", datetime(2024, 1, 1), "solarman", "pv01_voltage", "1200", range_error(0, 1000))
+    assert errors[1] == ("cust", "SN1", datetime(2023, 11, 14, 22, 13, 20, tzinfo=timezone.utc), "solarman", None, "1700000000000", "bad row")
+    # Unusable stamps fall back to the logging time so the NOT NULL column always gets a value; the raw stamp stays in field_value
+    assert errors[2][4:] == (None, None, "null timestamp")
+    assert errors[3][4:] == (None, "not a time", "bad timestamp")
+    for error in errors[2:]:
+        assert before <= error[2] <= after
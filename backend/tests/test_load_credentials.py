@@ -0,0 +1,15 @@
+from backend.utils.load_credentials import read_credentials_csv
+
+def test_read_credentials_csv_skips_rows_without_user_or_customer(tmp_path):
+    csv_file = tmp_path / "credentials.csv"
+    csv_file.write_text(
+        "user_id,customer_id,api_provider,username,password\n"
+        "u1,c1,solarman,alice,\"pa,ss\"\n"
+        ",c1,solarman,bob,pw\n"
+        "u3,,soliscloud,carol,pw\n"
+        "\n",
+        encoding="utf-8",
+    )
+
+    # Missing columns and empty fields become NULL; rows missing either key are dropped instead of failing the batch
+    assert read_credentials_csv(str(csv_file)) == [("u1", "c1", "solarman", "alice", "pa,ss", None, None)]
@@ -1,30 +1,112 @@
-import os
-import sys
 import logging
 import hashlib
 import time
 import requests
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from datetime import datetime, timedelta
-from config.settings import COMPANY_KEY
+from backend.config.settings import settings
+from backend.utils.api_utils import create_http_session
 from pytz import timezone
 
+logger = logging.getLogger(__name__)
+
+# Ordered (title substrings, target) rules; the first match wins, as shinemonitor reuses phrases like "grid voltage A"
+# across columns. A str target is a column, a tuple is a (fault code, severity) pair.
+FAULT_TITLE_RULES = (
+    (("fault information 1",), ("FAULT_1", "medium")),
+    (("fault information 2",), ("FAULT_2", "medium")),
+    (("fault information 3",), ("FAULT_3", "high")),
+    (("fault information 4",), ("FAULT_4", "high")),
+)
+HISTORICAL_TITLE_RULES = (
+    (("PV1 input voltage", "PV1 voltage", "String 1 voltage", "DC voltage 1"), "pv01_voltage"),
+    (("PV2 input voltage", "PV2 voltage", "String 2 voltage", "DC voltage 2"), "pv02_voltage"),
+    (("PV3 input voltage", "PV3 voltage", "String 3 voltage", "DC voltage 3"), "pv03_voltage"),
+    (("PV1 Input current", "String 1 current", "DC current 1"), "pv01_current"),
+    (("PV2 Input current", "String 2 current", "DC current 2"), "pv02_current"),
+    (("PV3 Input current", "String 3 current", "DC current 3"), "pv03_current"),
+    (("R phase grid current", "grid current A"), "r_current"),
+    (("S phase grid current", "grid current B"), "s_current"),
+    (("T phase grid current", "grid current C"), "t_current"),
+    (("Grid line voltage RS", "grid voltage AB"), "rs_voltage"),
+    (("Grid line voltage ST", "grid voltage BC"), "st_voltage"),
+    (("Grid line voltage TR", "grid voltage AC"), "tr_voltage"),
+    (("R phase grid voltage", "grid voltage A"), "r_voltage"),
+    (("S phase grid voltage", "grid voltage B"), "s_voltage"),
+    (("T phase grid voltage", "grid voltage C"), "t_voltage"),
+    (("Grid frequency",), "frequency"),
+    (("Grid connected power", "output power", "PV power generation today (kWh)"), "total_power"),
+    (("output reactive power", "total reactive energy"), "reactive_power"),
+    (("CUF", "cuf"), "cuf"),
+    (("Inverter operation mode", "running state", "Inverter status"), "state"),
+    (("inverter efficiency",), "pr"),
+    (("today energy",), "energy_today"),
+    *FAULT_TITLE_RULES,
+)
+CURRENT_TITLE_RULES = (
+    (("PV1 input voltage", "PV1 voltage", "String 1 voltage", "DC voltage 1 (V)"), "pv01_voltage"),
+    (("PV2 input voltage", "PV2 voltage", "String 2 voltage", "DC voltage 2 (V)"), "pv02_voltage"),
+    (("PV3 input voltage", "PV3 voltage", "String 3 voltage", "DC voltage 3 (V)"), "pv03_voltage"),
+    (("PV1 Input current", "String 1 current", "DC current 1 (A)"), "pv01_current"),
+    (("PV2 Input current", "String 2 current", "DC current 2 (A)"), "pv02_current"),
+    (("PV3 Input current", "String 3 current", "DC current 3"), "pv03_current"),
+    (("R phase grid voltage", "grid voltage A"), "r_voltage"),
+    (("S phase grid voltage", "grid voltage B"), "s_voltage"),
+    (("T phase grid voltage", "grid voltage C"), "t_voltage"),
+    (("Grid frequency",), "frequency"),
+    (("Grid connected power", "output power"), "total_power"),
+    (("Inverter operation mode", "running state"), "state"),
+    (("today energy", "energy today"), "energy_today"),
+    (("output reactive power",), "reactive_power"),
+    (("inverter efficiency",), "pr"),
+    *FAULT_TITLE_RULES,
+)
+
+# Values for columns a device does not report; energy_today stays absent on historical rows
+HISTORICAL_DEFAULTS = {
+    **{f"pv{i:02d}_{kind}": 0 for i in range(1, 13) for kind in ("voltage", "current")},
+    **dict.fromkeys(("r_current", "s_current", "t_current", "r_voltage", "s_voltage", "t_voltage"), 0),
+    **dict.fromkeys(("rs_voltage", "st_voltage", "tr_voltage", "frequency", "total_power", "reactive_power", "cuf", "pr"), 0),
+    "state": "unknown",
+}
+CURRENT_DEFAULTS = {**HISTORICAL_DEFAULTS, "energy_today": 0}
+
+def resolve_titles(titles, rules):
+    # The titles are fixed for a whole response, so the substring matching runs once per column, not once per cell
+    columns = []
+    for idx, title in enumerate(titles):
+        title_text = title["title"]
+        for needles, target in rules:
+            if any(k in title_text for k in needles):
+                columns.append((idx, target))
+                break
+    return columns
+
+def parse_row(device_sn, fields, columns, defaults):
+    entry = {"device_id": device_sn, "timestamp": fields[1]}
+    faults = []
+    for idx, target in columns:
+        value = fields[idx]
+        if not value:
+            continue
+        if target == "state":
+            entry["state"] = value
+        elif isinstance(target, tuple):
+            faults.append({"code": target[0], "description": value, "severity": target[1]})
+        else:
+            entry[target] = float(value)
+    return {**defaults, **entry, "faults": faults}
+
 class ShinemonitorAPI:
     def __init__(self, company_key=None, base_url="http://api.shinemonitor.com/public/"):
-        self.company_key = company_key if company_key is not None else COMPANY_KEY
+        self.company_key = company_key if company_key is not None else settings.COMPANY_KEY
         self.base_url = base_url
         self.secret = None
         self.token = None
-        self.logger = logging.getLogger(__name__)
-        if not self.logger.handlers:
-            logging.basicConfig(
-                level=logging.INFO,
-                format='%(asctime)s - %(levelname)s - %(message)s',
-                handlers=[
-                    logging.StreamHandler(),
-                    logging.FileHandler('shinemonitor_api.log', encoding='utf-8')
-                ]
-            )
+        self.session = create_http_session()
+        self.logger = logger
+
+    def close(self):
+        self.session.close()
 
     def calculate_sign(self, salt, secret_or_pwd, additional_params, is_auth=False):
         if is_auth:
@@ -41,7 +123,7 @@ class ShinemonitorAPI:
             sign = self.calculate_sign(salt, password, action_params, is_auth=True)
             url = f"{self.base_url}?sign={sign}&salt={salt}{action_params}"
 
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -73,7 +155,7 @@ class ShinemonitorAPI:
             sign = self.calculate_sign(salt, self.secret, f"{self.token}{action_params}")
             url = f"{self.base_url}?sign={sign}&salt={salt}&token={self.token}{action_params}"
 
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -107,7 +189,7 @@ class ShinemonitorAPI:
             sign = self.calculate_sign(salt, self.secret, f"{self.token}{action_params}")
             url = f"{self.base_url}?sign={sign}&salt={salt}&token={self.token}{action_params}"
 
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -132,7 +214,7 @@ class ShinemonitorAPI:
             sign = self.calculate_sign(salt, self.secret, f"{self.token}{action_params}")
             url = f"{self.base_url}?sign={sign}&salt={salt}&token={self.token}{action_params}"
 
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -181,7 +263,7 @@ class ShinemonitorAPI:
                 sign = self.calculate_sign(salt, self.secret, f"{self.token}{action_params}")
                 url = f"{self.base_url}?sign={sign}&salt={salt}&token={self.token}{action_params}"
 
-                response = requests.get(url, timeout=30)
+                response = self.session.get(url, timeout=30)
                 response.raise_for_status()
                 data = response.json()
 
@@ -189,116 +271,13 @@ class ShinemonitorAPI:
                     self.logger.error(f"Error fetching historical data for device {device['sn']} on {date_str}: {data.get('desc')}")
                 else:
                     daily_data = data["dat"]["row"]
-                    self.logger.info(f"Received {len(daily_data)} data rows for device {device['sn']} on {date_str}")
+                    self.logger.debug("Received %s data rows for device %s on %s", len(daily_data), device['sn'], date_str)
                     if daily_data:
-                        for row in daily_data:
-                            fields = row["field"]
-                            entry = {"device_id": device["sn"], "timestamp": fields[1]}
-                            faults = []
-                            for idx, title in enumerate(data["dat"]["title"]):
-                                value = fields[idx]
-                                if not value or value == "":
-                                    continue
-                                title_text = title["title"]
-
-                                if any(k in title_text for k in ["PV1 input voltage", "PV1 voltage", "String 1 voltage", "DC voltage 1"]):
-                                    entry["pv01_voltage"] = float(value)
-                                elif any(k in title_text for k in ["PV2 input voltage", "PV2 voltage", "String 2 voltage", "DC voltage 2"]):
-                                    entry["pv02_voltage"] = float(value)
-                                elif any(k in title_text for k in ["PV3 input voltage", "PV3 voltage", "String 3 voltage", "DC voltage 3"]):
-                                    entry["pv03_voltage"] = float(value)
-                                elif any(k in title_text for k in ["PV1 Input current", "String 1 current", "DC current 1"]):
-                                    entry["pv01_current"] = float(value)
-                                elif any(k in title_text for k in ["PV2 Input current", "String 2 current", "DC current 2"]):
-                                    entry["pv02_current"] = float(value)
-                                elif any(k in title_text for k in ["PV3 Input current", "String 3 current", "DC current 3"]):
-                                    entry["pv03_current"] = float(value)
-                                elif "R phase grid current" in title_text or "grid current A" in title_text:
-                                    entry["r_current"] = float(value)
-                                elif "S phase grid current" in title_text or "grid current B" in title_text:
-                                    entry["s_current"] = float(value)
-                                elif "T phase grid current" in title_text or "grid current C" in title_text:
-                                    entry["t_current"] = float(value)
-                                elif "Grid line voltage RS" in title_text or "grid voltage AB" in title_text:
-                                    entry["rs_voltage"] = float(value)
-                                elif "Grid line voltage ST" in title_text or "grid voltage BC" in title_text:
-                                    entry["st_voltage"] = float(value)
-                                elif "Grid line voltage TR" in title_text or "grid voltage AC" in title_text:
-                                    entry["tr_voltage"] = float(value)
-                                elif "R phase grid voltage" in title_text or "grid voltage A" in title_text:
-                                    entry["r_voltage"] = float(value)
-                                elif "S phase grid voltage" in title_text or "grid voltage B" in title_text:
-                                    entry["s_voltage"] = float(value)
-                                elif "T phase grid voltage" in title_text or "grid voltage C" in title_text:
-                                    entry["t_voltage"] = float(value)
-                                elif "Grid frequency" in title_text:
-                                    entry["frequency"] = float(value)
-                                elif any(k in title_text for k in ["Grid connected power", "output power", "PV power generation today (kWh)"]):
-                                    entry["total_power"] = float(value)
-                                elif "output reactive power" in title_text or "total reactive energy" in title_text:
-                                    entry["reactive_power"] = float(value)
-                                elif "CUF" in title_text or "cuf" in title_text:
-                                    entry["cuf"] = float(value)
-                                elif "Inverter operation mode" in title_text or "running state" in title_text or "Inverter status" in title_text:
-                                    entry["state"] = value
-                                elif "inverter efficiency" in title_text:
-                                    entry["pr"] = float(value)
-                                elif "today energy" in title_text:
-                                    entry["energy_today"] = float(value)
-                                elif "fault information 1" in title_text and value:
-                                    faults.append({"code": "FAULT_1", "description": value, "severity": "medium"})
-                                elif "fault information 2" in title_text and value:
-                                    faults.append({"code": "FAULT_2", "description": value, "severity": "medium"})
-                                elif "fault information 3" in title_text and value:
-                                    faults.append({"code": "FAULT_3", "description": value, "severity": "high"})
-                                elif "fault information 4" in title_text and value:
-                                    faults.append({"code": "FAULT_4", "description": value, "severity": "high"})
-
-                            entry.update({
-                                "pv01_voltage": entry.get("pv01_voltage", 0),
-                                "pv01_current": entry.get("pv01_current", 0),
-                                "pv02_voltage": entry.get("pv02_voltage", 0),
-                                "pv02_current": entry.get("pv02_current", 0),
-                                "pv03_voltage": entry.get("pv03_voltage", 0),
-                                "pv03_current": entry.get("pv03_current", 0),
-                                "pv04_voltage": entry.get("pv04_voltage", 0),
-                                "pv04_current": entry.get("pv04_current", 0),
-                                "pv05_voltage": entry.get("pv05_voltage", 0),
-                                "pv05_current": entry.get("pv05_current", 0),
-                                "pv06_voltage": entry.get("pv06_voltage", 0),
-                                "pv06_current": entry.get("pv06_current", 0),
-                                "pv07_voltage": entry.get("pv07_voltage", 0),
-                                "pv07_current": entry.get("pv07_current", 0),
-                                "pv08_voltage": entry.get("pv08_voltage", 0),
-                                "pv08_current": entry.get("pv08_current", 0),
-                                "pv09_voltage": entry.get("pv09_voltage", 0),
-                                "pv09_current": entry.get("pv09_current", 0),
-                                "pv10_voltage": entry.get("pv10_voltage", 0),
-                                "pv10_current": entry.get("pv10_current", 0),
-                                "pv11_voltage": entry.get("pv11_voltage", 0),
-                                "pv11_current": entry.get("pv11_current", 0),
-                                "pv12_voltage": entry.get("pv12_voltage", 0),
-                                "pv12_current": entry.get("pv12_current", 0),
-                                "r_current": entry.get("r_current", 0),
-                                "s_current": entry.get("s_current", 0),
-                                "t_current": entry.get("t_current", 0),
-                                "r_voltage": entry.get("r_voltage", 0),
-                                "s_voltage": entry.get("s_voltage", 0),
-                                "t_voltage": entry.get("t_voltage", 0),
-                                "rs_voltage": entry.get("rs_voltage", 0),
-                                "st_voltage": entry.get("st_voltage", 0),
-                                "tr_voltage": entry.get("tr_voltage", 0),
-                                "frequency": entry.get("frequency", 0),
-                                "total_power": entry.get("total_power", 0),
-                                "reactive_power": entry.get("reactive_power", 0),
-                                "cuf": entry.get("cuf", 0),
-                                "pr": entry.get("pr", 0),
-                                "state": entry.get("state", "unknown"),
-                                "faults": faults
-                            })
-                            all_data.append(entry)
+                        columns = resolve_titles(data["dat"]["title"], HISTORICAL_TITLE_RULES)
+                        all_data.extend(parse_row(device["sn"], row["field"], columns, HISTORICAL_DEFAULTS) for row in daily_data)
                 current_date += timedelta(days=1)
 
+            self.logger.info(f"Fetched {len(all_data)} historical data rows for device {device['sn']}")
             return all_data
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Error fetching historical data for device {device['sn']}: {e}")
@@ -319,7 +298,7 @@ class ShinemonitorAPI:
             sign = self.calculate_sign(salt, self.secret, f"{self.token}{action_params}")
             url = f"{self.base_url}?sign={sign}&salt={salt}&token={self.token}{action_params}"
 
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -331,100 +310,9 @@ class ShinemonitorAPI:
             if not rows:
                 return []
 
-            current_data = []
-            for row in rows:
-                fields = row["field"]
-                entry = {"device_id": device["sn"], "timestamp": fields[1]}
-                faults = []
-                for idx, title in enumerate(data["dat"]["title"]):
-                    value = fields[idx]
-                    if not value or value == "":
-                        continue
-                    title_text = title["title"]
-
-                    if any(k in title_text for k in ["PV1 input voltage", "PV1 voltage", "String 1 voltage", "DC voltage 1 (V)"]):
-                        entry["pv01_voltage"] = float(value)
-                    elif any(k in title_text for k in ["PV2 input voltage", "PV2 voltage", "String 2 voltage", "DC voltage 2 (V)"]):
-                        entry["pv02_voltage"] = float(value)
-                    elif any(k in title_text for k in ["PV3 input voltage", "PV3 voltage", "String 3 voltage", "DC voltage 3 (V)"]):
-                        entry["pv03_voltage"] = float(value)
-                    elif any(k in title_text for k in ["PV1 Input current", "String 1 current", "DC current 1 (A)"]):
-                        entry["pv01_current"] = float(value)
-                    elif any(k in title_text for k in ["PV2 Input current", "String 2 current", "DC current 2 (A)"]):
-                        entry["pv02_current"] = float(value)
-                    elif any(k in title_text for k in ["PV3 Input current", "String 3 current", "DC current 3"]):
-                        entry["pv03_current"] = float(value)
-                    elif "R phase grid voltage" in title_text or "grid voltage A" in title_text:
-                        entry["r_voltage"] = float(value)
-                    elif "S phase grid voltage" in title_text or "grid voltage B" in title_text:
-                        entry["s_voltage"] = float(value)
-                    elif "T phase grid voltage" in title_text or "grid voltage C" in title_text:
-                        entry["t_voltage"] = float(value)
-                    elif "Grid frequency" in title_text:
-                        entry["frequency"] = float(value)
-                    elif any(k in title_text for k in ["Grid connected power", "output power"]):
-                        entry["total_power"] = float(value)
-                    elif "Inverter operation mode" in title_text or "running state" in title_text:
-                        entry["state"] = value
-                    elif "today energy" in title_text or "energy today" in title_text:
-                        entry["energy_today"] = float(value)
-                    elif "output reactive power" in title_text:
-                        entry["reactive_power"] = float(value)
-                    elif "inverter efficiency" in title_text:
-                        entry["pr"] = float(value)
-                    elif "fault information 1" in title_text and value:
-                        faults.append({"code": "FAULT_1", "description": value, "severity": "medium"})
-                    elif "fault information 2" in title_text and value:
-                        faults.append({"code": "FAULT_2", "description": value, "severity": "medium"})
-                    elif "fault information 3" in title_text and value:
-                        faults.append({"code": "FAULT_3", "description": value, "severity": "high"})
-                    elif "fault information 4" in title_text and value:
-                        faults.append({"code": "FAULT_4", "description": value, "severity": "high"})
-
-                entry.update({
-                    "pv01_voltage": entry.get("pv01_voltage", 0),
-                    "pv01_current": entry.get("pv01_current", 0),
-                    "pv02_voltage": entry.get("pv02_voltage", 0),
-                    "pv02_current": entry.get("pv02_current", 0),
-                    "pv03_voltage": entry.get("pv03_voltage", 0),
-                    "pv03_current": entry.get("pv03_current", 0),
-                    "pv04_voltage": entry.get("pv04_voltage", 0),
-                    "pv04_current": entry.get("pv04_current", 0),
-                    "pv05_voltage": entry.get("pv05_voltage", 0),
-                    "pv05_current": entry.get("pv05_current", 0),
-                    "pv06_voltage": entry.get("pv06_voltage", 0),
-                    "pv06_current": entry.get("pv06_current", 0),
-                    "pv07_voltage": entry.get("pv07_voltage", 0),
-                    "pv07_current": entry.get("pv07_current", 0),
-                    "pv08_voltage": entry.get("pv08_voltage", 0),
-                    "pv08_current": entry.get("pv08_current", 0),
-                    "pv09_voltage": entry.get("pv09_voltage", 0),
-                    "pv09_current": entry.get("pv09_current", 0),
-                    "pv10_voltage": entry.get("pv10_voltage", 0),
-                    "pv10_current": entry.get("pv10_current", 0),
-                    "pv11_voltage": entry.get("pv11_voltage", 0),
-                    "pv11_current": entry.get("pv11_current", 0),
-                    "pv12_voltage": entry.get("pv12_voltage", 0),
-                    "pv12_current": entry.get("pv12_current", 0),
-                    "r_voltage": entry.get("r_voltage", 0),
-                    "s_voltage": entry.get("s_voltage", 0),
-                    "t_voltage": entry.get("t_voltage", 0),
-                    "r_current": entry.get("r_current", 0),
-                    "s_current": entry.get("s_current", 0),
-                    "t_current": entry.get("t_current", 0),
-                    "rs_voltage": entry.get("rs_voltage", 0),
-                    "st_voltage": entry.get("st_voltage", 0),
-                    "tr_voltage": entry.get("tr_voltage", 0),
-                    "frequency": entry.get("frequency", 0),
-                    "total_power": entry.get("total_power", 0),
-                    "reactive_power": entry.get("reactive_power", 0),
-                    "energy_today": entry.get("energy_today", float(data["dat"].get("energy_today", 0))),
-                    "cuf": entry.get("cuf", 0),
-                    "pr": entry.get("pr", 0),
-                    "state": entry.get("state", "unknown"),
-                    "faults": faults
-                })
-                current_data.append(entry)
+            columns = resolve_titles(data["dat"]["title"], CURRENT_TITLE_RULES)
+            defaults = {**CURRENT_DEFAULTS, "energy_today": float(data["dat"].get("energy_today", 0))}
+            current_data = [parse_row(device["sn"], row["field"], columns, defaults) for row in rows]
 
             return current_data
         except requests.exceptions.RequestException as e:
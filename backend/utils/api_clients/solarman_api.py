@@ -1,19 +1,43 @@
 import json
 import logging
+import threading
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from dateutil import tz
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from backend.utils.api_utils import create_http_session, epoch_seconds
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()]
-)
 logger = logging.getLogger(__name__)
 
+# Built once instead of per sample inside the parsing loops
+UTC = tz.tzutc()
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+RECENT_WINDOW = timedelta(minutes=5)
+
+# Solarman dataList key (lower-cased) -> device_data_historical column; unmapped keys are ignored
+SOLARMAN_KEY_MAP = {
+    **{f"dc{i}": f"pv{i:02d}_current" for i in range(1, 17)},
+    **{f"dv{i}": f"pv{i:02d}_voltage" for i in range(1, 17)},
+    **{f"pv{i}_{kind}": f"pv{i:02d}_{kind}" for i in range(1, 13) for kind in ("voltage", "current")},
+    "av1": "r_voltage", "av2": "s_voltage", "av3": "t_voltage",
+    "ac1": "r_current", "ac2": "s_current", "ac3": "t_current",
+    **{key: key for key in ("r_voltage", "s_voltage", "t_voltage", "r_current", "s_current", "t_current",
+                            "rs_voltage", "st_voltage", "tr_voltage", "frequency", "total_power",
+                            "reactive_power", "energy_today", "pr", "state")},
+    "tpg": "total_power", "power": "total_power",
+    "etdy_ge1": "energy_today",
+    "a_fo1": "frequency",
+    "inv_st1": "state", "status": "state",
+    "dpi_t1": "total_dc_input_power",
+}
+
+def _map_data_list(entry: Dict, data_list: List[Dict]) -> None:
+    for item in data_list:
+        column = SOLARMAN_KEY_MAP.get(item.get("key", "").lower())
+        if column:
+            entry[column] = item.get("value")
+
 class SolarmanAPI:
     def __init__(self, email: str, password_sha256: str, app_id: str, app_secret: str):
         self.base_url = "https://globalapi.solarmanpv.com"
@@ -23,17 +47,17 @@ class SolarmanAPI:
         self.app_secret = app_secret
         self.access_token: Optional[str] = None
         self.token_expiry: Optional[float] = None
+        self._token_lock = threading.Lock()
+        self.session = create_http_session()
+
+    def close(self) -> None:
+        self.session.close()
 
     def _is_token_expired(self) -> bool:
         if not self.access_token or not self.token_expiry:
             return True
         return time.time() >= self.token_expiry
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type(requests.exceptions.RequestException)
-    )
     def get_access_token(self) -> None:
         url = f"{self.base_url}/account/v1.0/token?appId={self.app_id}"
         payload = {
@@ -44,10 +68,11 @@ class SolarmanAPI:
         headers = {"Content-Type": "application/json"}
 
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.session.post(url, headers=headers, json=payload, timeout=30)
             response.raise_for_status()
             data = response.json()
-            logger.debug(f"Token response: {json.dumps(data, indent=2, ensure_ascii=False)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Token response: %s", json.dumps(data, indent=2, ensure_ascii=False))
 
             if data.get("success"):
                 self.access_token = data["access_token"]
@@ -69,15 +94,13 @@ class SolarmanAPI:
             logger.error(f"Error obtaining access token: {str(e)}")
             raise
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=2, min=4, max=20),
-        retry=retry_if_exception_type(requests.exceptions.RequestException)
-    )
     def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None) -> Dict:
         if self._is_token_expired():
-            logger.info("Access token expired or not set. Obtaining new token...")
-            self.get_access_token()
+            # Device fetches run on a thread pool; only the first thread refreshes the token
+            with self._token_lock:
+                if self._is_token_expired():
+                    logger.info("Access token expired or not set. Obtaining new token...")
+                    self.get_access_token()
 
         url = f"{self.base_url}{endpoint}"
         headers = {
@@ -87,15 +110,16 @@ class SolarmanAPI:
 
         try:
             if method.upper() == "GET":
-                response = requests.get(url, headers=headers, params=params, timeout=30)
+                response = self.session.get(url, headers=headers, params=params, timeout=30)
             elif method.upper() == "POST":
-                response = requests.post(url, headers=headers, params=params, json=data, timeout=30)
+                response = self.session.post(url, headers=headers, params=params, json=data, timeout=30)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
             response.raise_for_status()
             result = response.json()
-            logger.debug(f"API response for {endpoint}: {json.dumps(result, indent=2, ensure_ascii=False)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("API response for %s: %s", endpoint, json.dumps(result, indent=2, ensure_ascii=False))
 
             if not result.get("success"):
                 logger.error(f"API request failed: {result.get('msg')}")
@@ -129,9 +153,10 @@ class SolarmanAPI:
     def get_historical_data(self, user_id: str, username: str, password: str, device: Dict, start_date: str, end_date: str) -> List[Dict]:
         endpoint = "/device/v1.0/historical?language=en"
         try:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=tz.tzutc())
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59, tzinfo=tz.tzutc())
-            now = datetime.now(tz.tzutc())
+            start_dt = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=UTC)
+            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59, tzinfo=UTC)
+            now = datetime.now(UTC)
+            recent_cutoff = now - RECENT_WINDOW
             if end_dt > now:
                 end_dt = now
             if start_dt > end_dt:
@@ -151,67 +176,21 @@ class SolarmanAPI:
         try:
             response = self._make_request("POST", endpoint, data=payload)
             param_data_list = response.get("paramDataList", [])
-            logger.debug(f"Raw paramDataList for {device.get('deviceSn')}: {param_data_list}")
+            logger.debug("Raw paramDataList for %s: %s", device.get('deviceSn'), param_data_list)
             for param_data in param_data_list:
                 collect_time = param_data.get("collectTime")
                 if isinstance(collect_time, (int, float)):
-                    collect_time_dt = datetime.fromtimestamp(collect_time / 1000 if len(str(int(collect_time))) > 10 else collect_time, tz=tz.tzutc())
-                    if now - collect_time_dt < timedelta(minutes=5):
-                        logger.debug(f"Skipping recent timestamp for device {device.get('deviceSn')}: {collect_time}")
+                    collect_time_dt = datetime.fromtimestamp(epoch_seconds(collect_time), tz=UTC)
+                    if collect_time_dt > recent_cutoff:
+                        logger.debug("Skipping recent timestamp for device %s: %s", device.get('deviceSn'), collect_time)
                         continue
-                    collect_time = collect_time_dt.strftime('%Y-%m-%d %H:%M:%S')
+                    collect_time = collect_time_dt.strftime(TIMESTAMP_FORMAT)
                 data_list = param_data.get("dataList", [])
                 if not data_list:
                     logger.warning(f"Skipping empty data entry for device {device.get('deviceSn')} at timestamp {collect_time}")
                     continue
                 entry = {"timestamp": collect_time}
-                for item in data_list:
-                    key = item.get("key", "").lower()
-                    value = item.get("value")
-                    if key in ['dc1', 'dc2', 'dc3', 'dc4', 'dc5', 'dc6', 'dc7', 'dc8', 'dc9', 'dc10', 'dc11', 'dc12', 'dc13', 'dc14', 'dc15', 'dc16']:
-                        pv_index = int(key.replace('dc', '')) if key.startswith('dc') else None
-                        if pv_index:
-                            entry[f'pv{pv_index:02d}_current'] = value
-                    elif key in ['dv1', 'dv2', 'dv3', 'dv4', 'dv5', 'dv6', 'dv7', 'dv8', 'dv9', 'dv10', 'dv11', 'dv12', 'dv13', 'dv14', 'dv15', 'dv16']:
-                        pv_index = int(key.replace('dv', '')) if key.startswith('dv') else None
-                        if pv_index:
-                            entry[f'pv{pv_index:02d}_voltage'] = value
-                    elif key in ['av1', 'av2', 'av3']:
-                        phase = {'av1': 'r', 'av2': 's', 'av3': 't'}.get(key)
-                        if phase:
-                            entry[f'{phase}_voltage'] = value
-                    elif key in ['ac1', 'ac2', 'ac3']:
-                        phase = {'ac1': 'r', 'ac2': 's', 'ac3': 't'}.get(key)
-                        if phase:
-                            entry[f'{phase}_current'] = value
-                    elif key == 'tpg':
-                        entry['total_power'] = value
-                    elif key == 'etdy_ge1':
-                        entry['energy_today'] = value
-                    elif key == 'a_fo1':
-                        entry['frequency'] = value
-                    elif key == 'inv_st1':
-                        entry['state'] = value
-                    elif key == 'dpi_t1':
-                        entry['total_dc_input_power'] = value
-                    elif key in ['pv1_voltage', 'pv2_voltage', 'pv3_voltage', 'pv4_voltage', 'pv5_voltage', 'pv6_voltage', 'pv7_voltage', 'pv8_voltage', 'pv9_voltage', 'pv10_voltage', 'pv11_voltage', 'pv12_voltage']:
-                        entry[key.replace('pv1_', 'pv01_').replace('pv2_', 'pv02_').replace('pv3_', 'pv03_').replace('pv4_', 'pv04_').replace('pv5_', 'pv05_').replace('pv6_', 'pv06_').replace('pv7_', 'pv07_').replace('pv8_', 'pv08_').replace('pv9_', 'pv09_')] = value
-                    elif key in ['pv1_current', 'pv2_current', 'pv3_current', 'pv4_current', 'pv5_current', 'pv6_current', 'pv7_current', 'pv8_current', 'pv9_current', 'pv10_current', 'pv11_current', 'pv12_current']:
-                        entry[key.replace('pv1_', 'pv01_').replace('pv2_', 'pv02_').replace('pv3_', 'pv03_').replace('pv4_', 'pv04_').replace('pv5_', 'pv05_').replace('pv6_', 'pv06_').replace('pv7_', 'pv07_').replace('pv8_', 'pv08_').replace('pv9_', 'pv09_')] = value
-                    elif key in ['r_voltage', 's_voltage', 't_voltage', 'r_current', 's_current', 't_current', 'rs_voltage', 'st_voltage', 'tr_voltage']:
-                        entry[key] = value
-                    elif key == 'frequency':
-                        entry['frequency'] = value
-                    elif key in ['total_power', 'power']:
-                        entry['total_power'] = value
-                    elif key in ['reactive_power']:
-                        entry['reactive_power'] = value
-                    elif key in ['energy_today', 'etdy_ge1']:
-                        entry['energy_today'] = value
-                    elif key in ['pr']:
-                        entry['pr'] = value
-                    elif key in ['state', 'status', 'inv_st1']:
-                        entry['state'] = value
+                _map_data_list(entry, data_list)
                 if len(entry) > 1:
                     normalized_data.append(entry)
                 else:
@@ -224,11 +203,12 @@ class SolarmanAPI:
     def get_current_day_data(self, user_id: str, username: str, password: str, device: Dict) -> List[Dict]:
         endpoint = "/device/v1.0/historical?language=en"
         try:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = datetime.now().strftime('%Y-%m-%d')
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=tz.tzutc())
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59, tzinfo=tz.tzutc())
-            now = datetime.now(tz.tzutc())
+            # One clock read for the day boundaries; the end of day is derived from the start instead of re-parsed
+            today = datetime.now().date()
+            start_dt = datetime(today.year, today.month, today.day, tzinfo=UTC)
+            end_dt = start_dt.replace(hour=23, minute=59, second=59)
+            now = datetime.now(UTC)
+            recent_cutoff = now - RECENT_WINDOW
             if end_dt > now:
                 end_dt = now
             if start_dt > end_dt:
@@ -251,7 +231,8 @@ class SolarmanAPI:
                 response = self._make_request("POST", endpoint, data=payload)
                 time.sleep(1)  # Rate limit
                 param_data_list = response.get("paramDataList", [])
-                logger.debug(f"Raw paramDataList for {device.get('deviceSn')} on {current_dt.strftime('%Y-%m-%d')}: {json.dumps(param_data_list, indent=2, ensure_ascii=False)}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Raw paramDataList for %s on %s: %s", device.get('deviceSn'), current_dt.strftime('%Y-%m-%d'), json.dumps(param_data_list, indent=2, ensure_ascii=False))
                 for param_data in param_data_list:
                     collect_time = param_data.get("collectTime")
                     if not collect_time:
@@ -259,31 +240,37 @@ class SolarmanAPI:
                         continue
                     if isinstance(collect_time, (int, float)):
                         try:
-                            timestamp = collect_time / 1000 if len(str(int(collect_time))) > 10 else collect_time
-                            collect_time_dt = datetime.fromtimestamp(timestamp, tz=tz.tzutc())
-                            if now - collect_time_dt < timedelta(minutes=5):
-                                logger.debug(f"Skipping recent timestamp for device {device.get('deviceSn')}: {collect_time}")
+                            timestamp = epoch_seconds(collect_time)
+                            collect_time_dt = datetime.fromtimestamp(timestamp, tz=UTC)
+                            if collect_time_dt > recent_cutoff:
+                                logger.debug("Skipping recent timestamp for device %s: %s", device.get('deviceSn'), collect_time)
                                 continue
-                            collect_time = collect_time_dt.strftime('%Y-%m-%d %H:%M:%S')
+                            collect_time = collect_time_dt.strftime(TIMESTAMP_FORMAT)
                         except (ValueError, TypeError) as e:
                             logger.error(f"Invalid collectTime number format for device {device.get('deviceSn')}: {collect_time}, error: {str(e)}")
                             continue
                     elif isinstance(collect_time, str):
+                        # Epoch strings are the common case, so try float() before falling back to the C-implemented fromisoformat
                         try:
-                            collect_time_dt = datetime.strptime(collect_time, '%Y-%m-%d %H:%M:%S')
-                            collect_time = collect_time_dt.strftime('%Y-%m-%d %H:%M:%S')
+                            timestamp = float(collect_time)
                         except ValueError:
-                            try:
-                                timestamp = float(collect_time)
-                                timestamp = timestamp / 1000 if len(str(int(timestamp))) > 10 else timestamp
-                                collect_time_dt = datetime.fromtimestamp(timestamp, tz=tz.tzutc())
-                                if now - collect_time_dt < timedelta(minutes=5):
-                                    logger.debug(f"Skipping recent timestamp for device {device.get('deviceSn')}: {collect_time}")
+                            timestamp = None
+                        try:
+                            if timestamp is None:
+                                collect_time_dt = datetime.fromisoformat(collect_time)
+                                # fromisoformat also accepts offsets; shift those to UTC like the epoch stamps instead of dropping them
+                                if collect_time_dt.tzinfo is not None:
+                                    collect_time_dt = collect_time_dt.astimezone(UTC)
+                                collect_time = collect_time_dt.strftime(TIMESTAMP_FORMAT)
+                            else:
+                                collect_time_dt = datetime.fromtimestamp(epoch_seconds(timestamp), tz=UTC)
+                                if collect_time_dt > recent_cutoff:
+                                    logger.debug("Skipping recent timestamp for device %s: %s", device.get('deviceSn'), collect_time)
                                     continue
-                                collect_time = collect_time_dt.strftime('%Y-%m-%d %H:%M:%S')
-                            except (ValueError, TypeError) as e:
-                                logger.error(f"Invalid string collectTime format for device {device.get('deviceSn')}: {collect_time}, error: {str(e)}")
-                                continue
+                                collect_time = collect_time_dt.strftime(TIMESTAMP_FORMAT)
+                        except (ValueError, TypeError, OverflowError, OSError) as e:
+                            logger.error(f"Invalid string collectTime format for device {device.get('deviceSn')}: {collect_time}, error: {str(e)}")
+                            continue
                     else:
                         logger.error(f"Unexpected collectTime type for device {device.get('deviceSn')}: {type(collect_time)}")
                         continue
@@ -293,53 +280,7 @@ class SolarmanAPI:
                         logger.warning(f"Skipping empty data entry for device {device.get('deviceSn')} at timestamp {collect_time}")
                         continue
                     entry = {"timestamp": collect_time}
-                    for item in data_list:
-                        key = item.get("key", "").lower()
-                        value = item.get("value")
-                        if key in ['dc1', 'dc2', 'dc3', 'dc4', 'dc5', 'dc6', 'dc7', 'dc8', 'dc9', 'dc10', 'dc11', 'dc12', 'dc13', 'dc14', 'dc15', 'dc16']:
-                            pv_index = int(key.replace('dc', '')) if key.startswith('dc') else None
-                            if pv_index:
-                                entry[f'pv{pv_index:02d}_current'] = value
-                        elif key in ['dv1', 'dv2', 'dv3', 'dv4', 'dv5', 'dv6', 'dv7', 'dv8', 'dv9', 'dv10', 'dv11', 'dv12', 'dv13', 'dv14', 'dv15', 'dv16']:
-                            pv_index = int(key.replace('dv', '')) if key.startswith('dv') else None
-                            if pv_index:
-                                entry[f'pv{pv_index:02d}_voltage'] = value
-                        elif key in ['av1', 'av2', 'av3']:
-                            phase = {'av1': 'r', 'av2': 's', 'av3': 't'}.get(key)
-                            if phase:
-                                entry[f'{phase}_voltage'] = value
-                        elif key in ['ac1', 'ac2', 'ac3']:
-                            phase = {'ac1': 'r', 'ac2': 's', 'ac3': 't'}.get(key)
-                            if phase:
-                                entry[f'{phase}_current'] = value
-                        elif key == 'tpg':
-                            entry['total_power'] = value
-                        elif key == 'etdy_ge1':
-                            entry['energy_today'] = value
-                        elif key == 'a_fo1':
-                            entry['frequency'] = value
-                        elif key == 'inv_st1':
-                            entry['state'] = value
-                        elif key == 'dpi_t1':
-                            entry['total_dc_input_power'] = value
-                        elif key in ['pv1_voltage', 'pv2_voltage', 'pv3_voltage', 'pv4_voltage', 'pv5_voltage', 'pv6_voltage', 'pv7_voltage', 'pv8_voltage', 'pv9_voltage', 'pv10_voltage', 'pv11_voltage', 'pv12_voltage']:
-                            entry[key.replace('pv1_', 'pv01_').replace('pv2_', 'pv02_').replace('pv3_', 'pv03_').replace('pv4_', 'pv04_').replace('pv5_', 'pv05_').replace('pv6_', 'pv06_').replace('pv7_', 'pv07_').replace('pv8_', 'pv08_').replace('pv9_', 'pv09_')] = value
-                        elif key in ['pv1_current', 'pv2_current', 'pv3_current', 'pv4_current', 'pv5_current', 'pv6_current', 'pv7_current', 'pv8_current', 'pv9_current', 'pv10_current', 'pv11_current', 'pv12_current']:
-                            entry[key.replace('pv1_', 'pv01_').replace('pv2_', 'pv02_').replace('pv3_', 'pv03_').replace('pv4_', 'pv04_').replace('pv5_', 'pv05_').replace('pv6_', 'pv06_').replace('pv7_', 'pv07_').replace('pv8_', 'pv08_').replace('pv9_', 'pv09_')] = value
-                        elif key in ['r_voltage', 's_voltage', 't_voltage', 'r_current', 's_current', 't_current', 'rs_voltage', 'st_voltage', 'tr_voltage']:
-                            entry[key] = value
-                        elif key == 'frequency':
-                            entry['frequency'] = value
-                        elif key in ['total_power', 'power']:
-                            entry['total_power'] = value
-                        elif key in ['reactive_power']:
-                            entry['reactive_power'] = value
-                        elif key in ['energy_today', 'etdy_ge1']:
-                            entry['energy_today'] = value
-                        elif key in ['pr']:
-                            entry['pr'] = value
-                        elif key in ['state', 'status', 'inv_st1']:
-                            entry['state'] = value
+                    _map_data_list(entry, data_list)
                     if len(entry) > 1:
                         normalized_data.append(entry)
                     else:
@@ -359,56 +300,10 @@ class SolarmanAPI:
         try:
             response = self._make_request("POST", endpoint, params=params, data=payload)
             data_list = response.get("dataList", [])
-            collect_time = datetime.now(tz.tzutc()).strftime('%Y-%m-%d %H:%M:%S')
+            collect_time = datetime.now(UTC).strftime(TIMESTAMP_FORMAT)
             normalized_data = []
             entry = {"timestamp": collect_time}
-            for item in data_list:
-                key = item.get("key", "").lower()
-                value = item.get("value")
-                if key in ['dc1', 'dc2', 'dc3', 'dc4', 'dc5', 'dc6', 'dc7', 'dc8', 'dc9', 'dc10', 'dc11', 'dc12', 'dc13', 'dc14', 'dc15', 'dc16']:
-                    pv_index = int(key.replace('dc', '')) if key.startswith('dc') else None
-                    if pv_index:
-                        entry[f'pv{pv_index:02d}_current'] = value
-                elif key in ['dv1', 'dv2', 'dv3', 'dv4', 'dv5', 'dv6', 'dv7', 'dv8', 'dv9', 'dv10', 'dv11', 'dv12', 'dv13', 'dv14', 'dv15', 'dv16']:
-                    pv_index = int(key.replace('dv', '')) if key.startswith('dv') else None
-                    if pv_index:
-                        entry[f'pv{pv_index:02d}_voltage'] = value
-                elif key in ['av1', 'av2', 'av3']:
-                    phase = {'av1': 'r', 'av2': 's', 'av3': 't'}.get(key)
-                    if phase:
-                        entry[f'{phase}_voltage'] = value
-                elif key in ['ac1', 'ac2', 'ac3']:
-                    phase = {'ac1': 'r', 'ac2': 's', 'ac3': 't'}.get(key)
-                    if phase:
-                        entry[f'{phase}_current'] = value
-                elif key == 'tpg':
-                    entry['total_power'] = value
-                elif key == 'etdy_ge1':
-                    entry['energy_today'] = value
-                elif key == 'a_fo1':
-                    entry['frequency'] = value
-                elif key == 'inv_st1':
-                    entry['state'] = value
-                elif key == 'dpi_t1':
-                    entry['total_dc_input_power'] = value
-                elif key in ['pv1_voltage', 'pv2_voltage', 'pv3_voltage', 'pv4_voltage', 'pv5_voltage', 'pv6_voltage', 'pv7_voltage', 'pv8_voltage', 'pv9_voltage', 'pv10_voltage', 'pv11_voltage', 'pv12_voltage']:
-                    entry[key.replace('pv1_', 'pv01_').replace('pv2_', 'pv02_').replace('pv3_', 'pv03_').replace('pv4_', 'pv04_').replace('pv5_', 'pv05_').replace('pv6_', 'pv06_').replace('pv7_', 'pv07_').replace('pv8_', 'pv08_').replace('pv9_', 'pv09_')] = value
-                elif key in ['pv1_current', 'pv2_current', 'pv3_current', 'pv4_current', 'pv5_current', 'pv6_current', 'pv7_current', 'pv8_current', 'pv9_current', 'pv10_current', 'pv11_current', 'pv12_current']:
-                    entry[key.replace('pv1_', 'pv01_').replace('pv2_', 'pv02_').replace('pv3_', 'pv03_').replace('pv4_', 'pv04_').replace('pv5_', 'pv05_').replace('pv6_', 'pv06_').replace('pv7_', 'pv07_').replace('pv8_', 'pv08_').replace('pv9_', 'pv09_')] = value
-                elif key in ['r_voltage', 's_voltage', 't_voltage', 'r_current', 's_current', 't_current', 'rs_voltage', 'st_voltage', 'tr_voltage']:
-                    entry[key] = value
-                elif key == 'frequency':
-                    entry['frequency'] = value
-                elif key in ['total_power', 'power']:
-                    entry['total_power'] = value
-                elif key in ['reactive_power']:
-                    entry['reactive_power'] = value
-                elif key in ['energy_today', 'etdy_ge1']:
-                    entry['energy_today'] = value
-                elif key in ['pr']:
-                    entry['pr'] = value
-                elif key in ['state', 'status', 'inv_st1']:
-                    entry['state'] = value
+            _map_data_list(entry, data_list)
             if len(entry) > 1:
                 normalized_data.append(entry)
             else:
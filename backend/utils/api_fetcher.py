@@ -4,39 +4,204 @@ from backend.config.settings import settings
 from backend.utils.api_clients.solarman_api import SolarmanAPI
 from backend.utils.api_clients.shinemonitor_api import ShinemonitorAPI
 from backend.utils.api_clients.soliscloud_api import SolisCloudAPI
-from backend.services.etl_service import normalize_data_entry, insert_data_to_db
+from backend.services.etl_service import insert_data_to_db
+from backend.repository.panel_repo import upsert_plants, upsert_devices, lock_devices
+from backend.repository.metric_repo import insert_error_logs, refresh_customer_metrics
+from backend.utils.api_utils import configure_logging, flatten_data
 import logging
-from datetime import datetime, timedelta
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import partial
+from logging.handlers import QueueHandler, QueueListener
 
-engine = create_engine(settings.POSTGRES_URL)
+# Each worker process writes through one pooled connection at a time, so keep the per-process pool small
+engine = create_engine(settings.DATABASE_URL, pool_size=1, max_overflow=2, pool_pre_ping=True)
 Session = sessionmaker(bind=engine)
 logger = logging.getLogger(__name__)
 
+FETCH_WORKERS = 16
+LOG_FILE = os.path.join("logs", "api_fetcher.log")
+# Caps in-flight requests per vendor within one worker process
+PROVIDER_SEMAPHORES = {
+    'solarman': threading.BoundedSemaphore(8),
+    'shinemonitor': threading.BoundedSemaphore(4),
+    'soliscloud': threading.BoundedSemaphore(2),
+}
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    # Client method names rather than bound functions, so the table stays picklable for the worker processes
+    plants_fn: str
+    devices_fn: str
+    historical_fn: str
+    realtime_fn: str
+    plant_id_key: str
+    device_sn_key: str
+    required_creds: tuple[str, ...]
+
+PROVIDERS = {
+    'solarman': ProviderSpec('get_plant_list', 'get_all_devices', 'get_historical_data', 'get_realtime_data', 'id', 'deviceSn', ('email', 'password_sha256', 'api_key', 'api_secret')),
+    'shinemonitor': ProviderSpec('fetch_plant_list', 'fetch_plant_devices', 'fetch_historical_data', 'fetch_current_data', 'plant_id', 'sn', ('username', 'password')),
+    'soliscloud': ProviderSpec('get_all_stations', 'get_all_inverters', 'get_inverter_historical_data', 'get_inverter_real_time_data', 'station_id', 'sn', ('api_key', 'api_secret')),
+}
+
 def get_client(api_provider, credential):
+    spec = PROVIDERS.get(api_provider)
+    if spec is None:
+        raise ValueError(f"Unknown API provider: {api_provider}")
+    missing = [key for key in spec.required_creds if not credential.get(key)]
+    if missing:
+        raise ValueError(f"Missing {api_provider} credentials: {', '.join(missing)}")
     if api_provider == 'solarman':
         return SolarmanAPI(credential['email'], credential['password_sha256'], credential['api_key'], credential['api_secret'])
     elif api_provider == 'shinemonitor':
         return ShinemonitorAPI(settings.COMPANY_KEY)
-    elif api_provider == 'soliscloud':
-        return SolisCloudAPI(credential['api_key'], credential['api_secret'])
-    raise ValueError(f"Unknown API provider: {api_provider}")
+    return SolisCloudAPI(credential['api_key'], credential['api_secret'])
+
+def _init_worker(log_queue, level):
+    # Spawned workers import this module afresh, so the engine is already their own; only logging needs wiring.
+    # Records go back to the parent's handlers through the pool's queue, which multiprocessing flushes at worker exit
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+def fetch_plant_devices(client, credential, plant):
+    spec = PROVIDERS[credential['api_provider']]
+    with PROVIDER_SEMAPHORES[credential['api_provider']]:
+        return getattr(client, spec.devices_fn)(credential['user_id'], credential['username'], credential['password'], plant[spec.plant_id_key])
+
+def fetch_device_bundle(client, credential, device, historical, start_date, end_date):
+    spec = PROVIDERS[credential['api_provider']]
+    with PROVIDER_SEMAPHORES[credential['api_provider']]:
+        if historical:
+            data = getattr(client, spec.historical_fn)(credential['user_id'], credential['username'], credential['password'], device, start_date, end_date)
+        else:
+            data = getattr(client, spec.realtime_fn)(credential['user_id'], credential['username'], credential['password'], device)
+    return device[spec.device_sn_key], data
+
+def fetch_window(today=None):
+    # Example: last week
+    today = today or date.today()
+    return (today - timedelta(days=7)).isoformat(), today.isoformat()
+
+def process_credential(credential, historical=False, window=None):
+    api_provider = credential['api_provider']
+    client = get_client(api_provider, credential)
+    spec = PROVIDERS[api_provider]
+    fetched_devices = set()  # Inverters shared across plants are fetched once per credential
+    # Every device gets the same window, even across midnight; the run passes one window to all workers
+    start_date, end_date = window or fetch_window()
+    # HTTP fetches overlap on threads; the session is not thread-safe, so all writes stay on this thread
+    with Session() as session, ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        try:
+            if historical:
+                # Backfills can be re-fetched from the vendor APIs, so skip waiting on the WAL flush for this transaction
+                session.execute(text("SET LOCAL synchronous_commit = off"))
+            plants = getattr(client, spec.plants_fn)(credential['user_id'], credential['username'], credential['password'])
+            upsert_plants(session, [
+                {
+                    "plant_id": str(plant[spec.plant_id_key]),
+                    "customer_id": credential['customer_id'],
+                    "plant_name": plant.get('plant_name') or plant.get('name') or "Unknown",
+                    "capacity": plant.get('capacity'),
+                    "total_energy": plant.get('total_energy'),
+                    "install_date": plant.get('install_date')
+                }
+                for plant in plants
+            ])
+            # The vendors have no multi-plant device listing, so the per-plant calls are overlapped instead
+            plant_devices = list(zip(plants, pool.map(partial(fetch_plant_devices, client, credential), plants)))
+            # All devices of the credential go out in one batch before any data is fetched
+            upsert_devices(session, [
+                {
+                    "device_sn": device[spec.device_sn_key],
+                    "plant_id": str(plant[spec.plant_id_key]),
+                    "inverter_model": device.get('inverter_model'),
+                    "panel_model": device.get('panel_model'),
+                    "pv_count": device.get('pv_count'),
+                    "string_count": device.get('string_count'),
+                    "first_install_date": device.get('first_install_date')
+                }
+                for plant, devices in plant_devices
+                for device in devices
+            ])
+            devices = []
+            for _, plant_device_list in plant_devices:
+                for device in plant_device_list:
+                    request_key = (api_provider, device[spec.device_sn_key])
+                    if request_key in fetched_devices:
+                        logger.debug("Skipping already fetched device %s", device[spec.device_sn_key])
+                        continue
+                    fetched_devices.add(request_key)
+                    devices.append(device)
+            # Credentials sharing an inverter run in other workers; one lock round-trip claims this run's devices
+            locked = lock_devices(session, [device[spec.device_sn_key] for device in devices])
+            devices = [device for device in devices if device[spec.device_sn_key] in locked]
+            futures = [pool.submit(fetch_device_bundle, client, credential, device, historical, start_date, end_date) for device in devices]
+            stored = 0
+            errors = []
+            for future in as_completed(futures):
+                device_sn, data = future.result()
+                device_stored, device_errors = insert_data_to_db(session, flatten_data(data), device_sn, credential['customer_id'], api_provider, not historical)
+                stored += device_stored
+                errors.extend(device_errors)
+            # Every device's validation and rejected-row errors go out in one batch with the credential's commit
+            insert_error_logs(session, errors)
+            session.commit()
+            return stored
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error processing credential for customer {credential['customer_id']}: {e}")
+            raise
+        finally:
+            # Drop queued fetches on failure before the client's HTTP session goes away
+            pool.shutdown(cancel_futures=True)
+            client.close()
 
 def fetch_for_all_panels(historical=False):  # Called from Airflow
+    configure_logging(logging.INFO, LOG_FILE)
+    with Session() as session:
+        credentials = [dict(row) for row in session.execute(text("SELECT * FROM api_credentials")).mappings()]
+    if not credentials:
+        logger.info("No API credentials to fetch")
+        return
+    # Customers are independent, so fan them out across CPU cores
+    max_workers = min(len(credentials), os.cpu_count() or 1)
+    window = fetch_window()
+    stored = 0
+    failed = 0
+    # spawn, not fork: the parent runs the log listener thread and may hold logging/urllib3 locks when workers start
+    mp_context = multiprocessing.get_context("spawn")
+    log_queue = mp_context.Queue()
+    root = logging.getLogger()
+    log_listener = QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    log_listener.start()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=_init_worker, initargs=(log_queue, root.level)) as executor:
+            futures = {executor.submit(process_credential, credential, historical, window): credential for credential in credentials}
+            # Each credential commits on its own, so one failure must not hide the others' rows or skip the refresh
+            for future in as_completed(futures):
+                credential = futures[future]
+                try:
+                    stored += future.result()
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Credential {credential['user_id']} ({credential['api_provider']}) failed: {e}")
+    finally:
+        log_listener.stop()
+    logger.info(f"Fetched data for {len(credentials) - failed}/{len(credentials)} credentials using {max_workers} workers, {stored} rows stored")
+    if not stored:
+        logger.info("No new device data, skipping customer_metrics refresh")
+        return
+    # One refresh per run once every worker has committed
     with Session() as session:
-        credentials = session.execute(text("SELECT * FROM api_credentials")).fetchall()
-        for cred_row in credentials:
-            credential = dict(cred_row)
-            api_provider = credential['api_provider']
-            client = get_client(api_provider, credential)
-            plants = client.get_plant_list(credential['user_id'], credential['username'], credential['password']) if api_provider == 'solarman' else ...  # Adapt per client
-            for plant in plants:
-                devices = client.get_all_devices(credential['user_id'], credential['username'], credential['password'], plant['plant_id']) if api_provider == 'solarman' else ...  # Adapt
-                for device in devices:
-                    if historical:
-                        start_date = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')  # Example: Last week
-                        data = client.get_historical_data(credential['user_id'], credential['username'], credential['password'], device, start_date, datetime.now().strftime('%Y-%m-%d'))
-                    else:
-                        data = client.get_realtime_data(credential['user_id'], credential['username'], credential['password'], device)
-                    normalized = [normalize_data_entry(entry, api_provider) for entry in data]
-                    insert_data_to_db(session, normalized, device['deviceSn'], credential['customer_id'], api_provider, not historical)
-            session.commit()
\ No newline at end of file
+        try:
+            refresh_customer_metrics(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
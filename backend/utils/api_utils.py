@@ -0,0 +1,134 @@
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import atexit
+import logging
+import os
+import queue
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Epoch seconds stay below 1e11 until the year 5138; millisecond stamps have been above it since 1973
+MS_TIMESTAMP_THRESHOLD = 1e11
+DATE_FORMAT = '%Y-%m-%d'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+def epoch_seconds(timestamp: int | float) -> float:
+    return timestamp / 1000 if timestamp > MS_TIMESTAMP_THRESHOLD else timestamp
+
+def convert_timestamp_to_date(timestamp, default: str = '1970-01-01'):
+    if not isinstance(timestamp, (int, float)):
+        return timestamp
+    try:
+        return datetime.fromtimestamp(epoch_seconds(timestamp), tz=timezone.utc).strftime(DATE_FORMAT)
+    except (ValueError, OSError, OverflowError):
+        return default
+
+def queue_log_handler(*handlers: logging.Handler) -> QueueHandler:
+    # Callers only enqueue records; file and stream writes happen on a listener thread off the fetch/insert path
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    # The record is merged into its message once on enqueue; the downstream handlers apply LOG_FORMAT
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def start_listener():
+        listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
+    # The listener thread does not survive a fork; the fetcher's process pool uses spawn for that reason
+    start_listener()
+    return queue_handler
+
+_logging_configured = False
+
+def configure_logging(level: int = logging.INFO, log_file: str | None = None) -> None:
+    # Called once per process by the entry points; the API clients only ever call logging.getLogger(__name__)
+    global _logging_configured
+    if _logging_configured:
+        return
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handlers.append(RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'))
+    root = logging.getLogger()
+    root.addHandler(queue_log_handler(*handlers))
+    root.setLevel(level)
+    _logging_configured = True
+
+class ProviderRetry(Retry):
+    # POSTs are not idempotent, so they are only retried when the provider refused them outright (429/503);
+    # connect errors are retried for every method, read timeouts and gateway errors only for GET
+    POST_RETRY_STATUSES = frozenset([429, 503])
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method and method.upper() == "POST":
+            return status_code in self.POST_RETRY_STATUSES
+        return super().is_retry(method, status_code, has_retry_after)
+
+# Transport-level retries for connection resets, timeouts and gateway errors; urllib3 2.x retries the first
+# failure immediately and then waits 2s and 4s with backoff_factor=1
+HTTP_RETRY = ProviderRetry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET"]),
+    raise_on_status=False,
+)
+
+def create_http_session(pool_size: int = 32) -> requests.Session:
+    # Keep-alive pool sized above the fetcher's thread count so concurrent device fetches reuse TLS connections
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=HTTP_RETRY)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def timestamp_key(timestamp):
+    # Providers mix epoch numbers (s or ms) and numeric strings; collapse them to whole seconds so one instant hashes once
+    if isinstance(timestamp, str):
+        try:
+            timestamp = float(timestamp)
+        except ValueError:
+            return timestamp
+    if isinstance(timestamp, (int, float)):
+        return int(epoch_seconds(timestamp))
+    return timestamp
+
+def dedupe_entries(entries) -> list[dict]:
+    # Later duplicates of the same instant replace earlier ones; entries without a timestamp pass through
+    seen = {}
+    undated = []
+    for entry in entries:
+        timestamp = entry.get("timestamp")
+        if timestamp is None:
+            undated.append(entry)
+        else:
+            seen[timestamp_key(timestamp)] = entry
+    return [*seen.values(), *undated]
+
+def flatten_data(data) -> list[dict]:
+    # Clients return a list of entries, possibly nested per page/day; walk it with a worklist instead of recursing
+    if data is None:
+        return []
+    if isinstance(data, list) and all(isinstance(item, dict) for item in data):
+        # Common case: a single page of entries needs no walking at all
+        flattened = dedupe_entries(data)
+    else:
+        stack = deque([data])
+        entries = []
+        while stack:
+            item = stack.popleft()
+            if isinstance(item, dict):
+                entries.append(item)
+            elif isinstance(item, list):
+                stack.extendleft(reversed(item))
+        flattened = dedupe_entries(entries)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Flattened %s entries", len(flattened))
+    return flattened
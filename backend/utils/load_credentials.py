@@ -0,0 +1,85 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from psycopg2.extras import execute_values
+from backend.config.settings import settings
+from backend.repository.panel_repo import get_cursor, insert_rows_individually
+from operator import itemgetter
+import csv
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_COLUMNS = ("user_id", "customer_id", "api_provider", "username", "password", "api_key", "api_secret")
+
+INSERT_CREDENTIALS_SQL = f"""
+    INSERT INTO api_credentials ({", ".join(CREDENTIAL_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (user_id) DO NOTHING
+"""
+CREDENTIAL_TEMPLATE = f"({', '.join(['%s'] * len(CREDENTIAL_COLUMNS))})"
+
+def read_credentials_csv(csv_file: str) -> list[tuple]:
+    # csv.reader handles quoted fields with embedded commas; rows are read as tuples in CREDENTIAL_COLUMNS order
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return []
+        index = {name.strip(): i for i, name in enumerate(header)}
+        positions = [index.get(column) for column in CREDENTIAL_COLUMNS]
+        customer_pos = CREDENTIAL_COLUMNS.index("customer_id")
+        credentials = []
+        skipped = 0
+        skipped_customer = 0
+        for row in reader:
+            values = [(row[i] or None) if i is not None and i < len(row) else None for i in positions]
+            # user_id is the conflict key and NOT NULL; a row without it would fail the whole batch
+            if values[0] is None:
+                if row:
+                    skipped += 1
+                continue
+            # customer_id references customers, so there is no placeholder that would pass the foreign key
+            if values[customer_pos] is None:
+                skipped_customer += 1
+                continue
+            credentials.append(tuple(values))
+    if skipped:
+        logger.warning(f"Skipped {skipped} rows without user_id in {csv_file}")
+    if skipped_customer:
+        logger.warning(f"Skipped {skipped_customer} rows without customer_id in {csv_file}")
+    return credentials
+
+def insert_credential(cur, credential: tuple) -> list[str]:
+    execute_values(cur, INSERT_CREDENTIALS_SQL, [credential], template=CREDENTIAL_TEMPLATE)
+    return [credential[0]] if cur.rowcount else []
+
+def load_credentials_to_db(session: Session, csv_file: str) -> None:
+    credentials = read_credentials_csv(csv_file)
+    if not credentials:
+        logger.info(f"No credentials found in {csv_file}")
+        return
+    try:
+        cur = get_cursor(session)
+        cur.execute("SAVEPOINT credentials_batch")
+        try:
+            execute_values(cur, INSERT_CREDENTIALS_SQL, credentials, template=CREDENTIAL_TEMPLATE, page_size=500)
+            cur.execute("RELEASE SAVEPOINT credentials_batch")
+        except Exception as e:
+            # A bad row only costs itself: the batch is rolled back to the savepoint and replayed row by row
+            cur.execute("ROLLBACK TO SAVEPOINT credentials_batch")
+            cur.execute("RELEASE SAVEPOINT credentials_batch")
+            logger.error(f"Error loading credentials in batch, retrying one by one: {e}")
+            insert_rows_individually(cur, credentials, itemgetter(0), insert_credential)
+        session.commit()
+        logger.info(f"Loaded {len(credentials)} credentials from {csv_file}")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Error loading credentials from {csv_file}: {e}")
+        raise
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    SessionLocal = sessionmaker(bind=create_engine(settings.DATABASE_URL))
+    with SessionLocal() as session:
+        load_credentials_to_db(session, sys.argv[1])
@@ -5,7 +5,7 @@
 
 -- Drop existing tables and types
 DROP TABLE IF EXISTS error_logs CASCADE;
-DROP TABLE IF EXISTS customer_metrics CASCADE;
+DROP MATERIALIZED VIEW IF EXISTS customer_metrics CASCADE;
 DROP TABLE IF EXISTS device_data_historical CASCADE;
 DROP TABLE IF EXISTS predictions CASCADE;
 DROP TABLE IF EXISTS fault_logs CASCADE;
@@ -164,7 +164,15 @@ CREATE TABLE device_data_historical (
     FOREIGN KEY (device_sn) REFERENCES devices(device_sn) ON DELETE CASCADE,
     PRIMARY KEY (device_sn, timestamp)
 );
-SELECT create_hypertable('device_data_historical', 'timestamp');
+-- Daily chunks: the metrics refresh and re-fetch merges only touch the last few days, so they prune to 1-8 chunks
+SELECT create_hypertable('device_data_historical', 'timestamp', chunk_time_interval => INTERVAL '1 day');
+-- Columnar compression per device; chunks stay uncompressed well past the 7-day re-fetch window the fetcher merges into
+ALTER TABLE device_data_historical SET (
+    timescaledb.compress,
+    timescaledb.compress_segmentby = 'device_sn',
+    timescaledb.compress_orderby = 'timestamp DESC'
+);
+SELECT add_compression_policy('device_data_historical', INTERVAL '14 days');
 
 -- Create predictions table
 CREATE TABLE predictions (
@@ -213,10 +221,26 @@ CREATE TABLE error_logs (
 SELECT create_hypertable('error_logs', 'timestamp');
 
 -- Create materialized view for admin panel metrics
+-- Defined once over device_data_historical and refreshed CONCURRENTLY by the fetcher, so readers are never blocked
 CREATE MATERIALIZED VIEW customer_metrics AS
-SELECT customer_id, 0.0 AS total_energy_today, 0.0 AS avg_pr, 0 AS active_devices
-FROM customers
+WITH device_today AS (
+    SELECT device_sn, MAX(energy_today) AS energy_today, AVG(pr) AS pr
+    FROM device_data_historical
+    WHERE timestamp >= date_trunc('day', NOW())
+    GROUP BY device_sn
+)
+SELECT c.customer_id,
+       COALESCE(SUM(t.energy_today), 0.0) AS total_energy_today,
+       COALESCE(AVG(t.pr), 0.0) AS avg_pr,
+       COUNT(t.device_sn) AS active_devices
+FROM customers c
+LEFT JOIN plants p ON p.customer_id = c.customer_id
+LEFT JOIN devices d ON d.plant_id = p.plant_id
+LEFT JOIN device_today t ON t.device_sn = d.device_sn
+GROUP BY c.customer_id
 WITH NO DATA;
+-- REFRESH ... CONCURRENTLY needs a unique index on the view
+CREATE UNIQUE INDEX idx_customer_metrics_customer_id ON customer_metrics(customer_id);
 
 -- Create trigger function for updated_at
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -1,8 +1,8 @@
 import json
 import logging
+import os
 import time
 import csv
-import io
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
@@ -16,15 +16,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def json_to_csv(json_data: Dict) -> str:
-    output = io.StringIO()
-    writer = csv.DictWriter(
-        output,
-        fieldnames=["collectTime", "deviceSn", "deviceType", "name", "value", "unit", "key"],
-        lineterminator='\n'
-    )
-    writer.writeheader()
+CSV_FIELDNAMES = ["collectTime", "deviceSn", "deviceType", "name", "value", "unit", "key"]
 
+def iter_csv_rows(json_data: Dict):
     device_sn = json_data.get("deviceSn", "")
     device_type = json_data.get("deviceType", "")
 
@@ -37,10 +31,8 @@ def json_to_csv(json_data: Dict) -> str:
                 collect_time = collect_time_raw
             else:
                 collect_time = datetime.utcfromtimestamp(int(collect_time_raw)).strftime('%Y-%m-%d %H:%M:%S')
-            data_list = param_data.get("dataList", [])
-
-            for item in data_list:
-                row = {
+            for item in param_data.get("dataList", []):
+                yield {
                     "collectTime": collect_time,
                     "deviceSn": device_sn,
                     "deviceType": device_type,
@@ -49,13 +41,11 @@ def json_to_csv(json_data: Dict) -> str:
                     "unit": item.get("unit", ""),
                     "key": item.get("key", "")
                 }
-                writer.writerow(row)
     # Handle real-time data (dataList)
     else:
-        data_list = json_data.get("dataList", [])
         collect_time = datetime.now(tz.tzutc()).strftime('%Y-%m-%d %H:%M:%S')
-        for item in data_list:
-            row = {
+        for item in json_data.get("dataList", []):
+            yield {
                 "collectTime": collect_time,
                 "deviceSn": device_sn,
                 "deviceType": device_type,
@@ -64,33 +54,41 @@ def json_to_csv(json_data: Dict) -> str:
                 "unit": item.get("unit", ""),
                 "key": item.get("key", "")
             }
-            writer.writerow(row)
 
-    csv_content = output.getvalue()
-    output.close()
-    return csv_content
+def json_to_csv(json_data: Dict, csv_filename: str) -> None:
+    # Rows are streamed straight into the file instead of building the whole CSV as one string first
+    with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(iter_csv_rows(json_data))
+    logger.info(f"Saved data to {csv_filename}")
 
-def json_to_name_columns_csv(json_data: Dict) -> str:
-    output = io.StringIO()
+def json_to_name_columns_csv(json_data: Dict, csv_filename: str) -> None:
     data_list = json_data.get("dataList", [])
-    
+
     # Create headers from 'name' fields
     fieldnames = [item.get("name", "") for item in data_list]
-    writer = csv.DictWriter(
-        output,
-        fieldnames=fieldnames,
-        lineterminator='\n',
-        quoting=csv.QUOTE_MINIMAL
-    )
-    writer.writeheader()
-
-    # Create single row from 'value' fields
-    row = {item.get("name", ""): item.get("value", "") for item in data_list}
-    writer.writerow(row)
-
-    csv_content = output.getvalue()
-    output.close()
-    return csv_content
+    with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(
+            f,
+            fieldnames=fieldnames,
+            lineterminator='\n',
+            quoting=csv.QUOTE_MINIMAL
+        )
+        writer.writeheader()
+        # Create single row from 'value' fields
+        writer.writerow({item.get("name", ""): item.get("value", "") for item in data_list})
+    logger.info(f"Saved name-as-columns data to {csv_filename}")
+
+SAVE_CSV = os.getenv("SAVE_CSV", "1") != "0"
+
+if not SAVE_CSV:
+    # Resolved once at import so a dry run skips row generation and file opens entirely
+    def json_to_csv(json_data: Dict, csv_filename: str) -> None:
+        pass
+
+    def json_to_name_columns_csv(json_data: Dict, csv_filename: str) -> None:
+        pass
 
 class SolarmanAPI:
     def __init__(self, email: str, password_sha256: str, app_id: str, app_secret: str):
@@ -317,11 +315,8 @@ def main(start_date: str = None, end_date: str = None):
                     historical_data = api.get_historical_data(device, start_date, end_date, time_type=2)
                     logger.info(f"Historical data for device {device_sn}: {json.dumps(historical_data, indent=2, ensure_ascii=False)}")
                     if historical_data.get("paramDataList"):
-                        csv_data = json_to_csv(historical_data)
                         csv_filename = f"historical_data_{device_sn}.csv"
-                        with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-                            f.write(csv_data)
-                        logger.info(f"Saved historical data to {csv_filename}")
+                        json_to_csv(historical_data, csv_filename)
                     else:
                         logger.info(f"No historical data available for device {device_sn}")
                 except Exception as e:
@@ -333,17 +328,11 @@ def main(start_date: str = None, end_date: str = None):
                     logger.info(f"Current data for device {device_sn}: {json.dumps(current_data, indent=2, ensure_ascii=False)}")
                     if current_data.get("dataList"):
                         # Save standard CSV
-                        csv_data = json_to_csv(current_data)
                         csv_filename = f"current_data_{device_sn}.csv"
-                        with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-                            f.write(csv_data)
-                        logger.info(f"Saved current data to {csv_filename}")
+                        json_to_csv(current_data, csv_filename)
                         # Save name-as-columns CSV
-                        name_columns_csv_data = json_to_name_columns_csv(current_data)
                         name_columns_csv_filename = f"current_data_name_columns_{device_sn}.csv"
-                        with open(name_columns_csv_filename, 'w', newline='', encoding='utf-8') as f:
-                            f.write(name_columns_csv_data)
-                        logger.info(f"Saved name-as-columns current data to {name_columns_csv_filename}")
+                        json_to_name_columns_csv(current_data, name_columns_csv_filename)
                     else:
                         logger.info(f"No current data available for device {device_sn}")
                 except Exception as e: